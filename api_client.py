@@ -1,73 +1,302 @@
 import os
+import time
+import asyncio
+import threading
+import httpx
 import openai
 import anthropic
-from utils import Rarity, Category, generate_id
+from utils import Rarity, Category, generate_id, estimate_tokens
+from artifact_parser import ArtifactStreamParser, parse_artifacts
+from rate_limiter import RateLimiter
+from mock_provider import MockProvider, MOCK_MODEL
+from retry import RetryPolicy, LatencyTracker, call_with_retries, acall_with_retries, is_retryable
 import random
-import re
+from concurrent.futures import ThreadPoolExecutor
+
+SYSTEM_PROMPT = "You are a creative system that generates unique artifacts with ASCII art and detailed descriptions."
+OPENAI_MODEL = "gpt-4"  # You can also use "gpt-3.5-turbo" for a less expensive option
+ANTHROPIC_MODEL = "claude-3-opus-20240229"
 
 class APIClient:
-    """Wrapper for AI API clients (OpenAI or Anthropic)"""
+    """Wrapper for AI API clients (OpenAI, Anthropic, or the offline mock)"""
+    
+    # Process-wide clients handed out by shared(), keyed by provider, api_key and options
+    _shared_clients = {}
+    _shared_lock = threading.Lock()
     
-    def __init__(self, api_key=None, provider="openai"):
+    def __init__(self, api_key=None, provider="openai", max_connections=20, max_keepalive_connections=10,
+                 keepalive_expiry=30.0, timeout=120.0, connect_timeout=10.0, cache=None, rate_limiter=None,
+                 retry_policy=None, mock_options=None):
         self.api_key = api_key
         self.provider = provider.lower()
+        self.mock_options = mock_options or {}  # MockProvider settings for provider="mock"
+        self.cache = cache  # Optional ResponseCache consulted before every call
+        
+        # Every provider call waits for a slot here, so bursts stay under the provider's limits
+        self.rate_limiter = rate_limiter or RateLimiter.for_provider(self.provider)
+        
+        # Transient failures are retried here instead of failing the whole batch
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.latency = LatencyTracker()  # Feeds the hedging threshold
+        
+        # Prompt-cache usage reported by the provider, summed over all calls
+        self.prompt_cache_stats = {"requests": 0, "cache_hit_tokens": 0, "cache_miss_tokens": 0, "cache_write_tokens": 0}
+        self._usage_lock = threading.Lock()
+        
+        # Connection pool settings, applied to both the sync and async HTTP clients
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry  # seconds an idle connection stays open
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        
+        self.client = None  # Long-lived provider client reused for every call
+        self._http_client = None
+        # Async SDK clients bind to the event loop they first run on, so each loop gets its own
+        self._async_clients = {}  # loop -> (async SDK client, httpx.AsyncClient)
+        self.closed = False
         self.setup_client()
         
+    @staticmethod
+    def _option_key(value):
+        """Hashable stand-in for a constructor option (dicts by content, objects by identity)"""
+        if isinstance(value, dict):
+            return tuple(sorted((name, APIClient._option_key(item)) for name, item in value.items()))
+        try:
+            hash(value)
+        except TypeError:
+            return ("id", id(value))
+        return value
+    
+    @classmethod
+    def shared(cls, api_key=None, provider="openai", **pool_options):
+        """Return the process-wide client for a provider, key and options, creating it on first use
+        
+        Callers asking for different options (cache, mock_options, pool size,
+        timeouts, ...) get different clients, so no setting is silently dropped.
+        """
+        options = tuple(sorted((name, cls._option_key(value)) for name, value in pool_options.items() if value is not None))
+        key = (provider.lower(), api_key, options)
+        with cls._shared_lock:
+            client = cls._shared_clients.get(key)
+            if client is None or client.closed:
+                client = cls(api_key, provider, **pool_options)
+                cls._shared_clients[key] = client
+            return client
+        
     def setup_client(self):
         """Set up the appropriate API client"""
         if self.provider == "openai":
-            if self.api_key:
-                openai.api_key = self.api_key
-            elif "OPENAI_API_KEY" in os.environ:
-                openai.api_key = os.environ["OPENAI_API_KEY"]
-            else:
+            if not self.api_key and "OPENAI_API_KEY" in os.environ:
+                self.api_key = os.environ["OPENAI_API_KEY"]
+            if not self.api_key:
                 raise ValueError("OpenAI API key not provided")
                 
-        elif self.provider == "anthropic":
-            if self.api_key:
-                self.anthropic_client = anthropic.Anthropic(api_key=self.api_key)
-            elif "ANTHROPIC_API_KEY" in os.environ:
-                self.anthropic_client = anthropic.Anthropic(api_key=os.environ["ANTHROPIC_API_KEY"])
+            if hasattr(openai, "OpenAI"):
+                self._http_client = httpx.Client(limits=self._pool_limits(), timeout=self._pool_timeout())
+                self.client = openai.OpenAI(api_key=self.api_key, http_client=self._http_client, max_retries=0)
             else:
+                # Older versions of the OpenAI library only have the module-level client
+                openai.api_key = self.api_key
+                
+        elif self.provider == "anthropic":
+            if not self.api_key and "ANTHROPIC_API_KEY" in os.environ:
+                self.api_key = os.environ["ANTHROPIC_API_KEY"]
+            if not self.api_key:
                 raise ValueError("Anthropic API key not provided")
+                
+            self._http_client = httpx.Client(limits=self._pool_limits(), timeout=self._pool_timeout())
+            self.client = anthropic.Anthropic(api_key=self.api_key, http_client=self._http_client, max_retries=0)
+            self.anthropic_client = self.client
+            
+        elif self.provider == "mock":
+            # Offline provider for benchmarks and load tests; no key needed
+            self.client = MockProvider(**self.mock_options)
         else:
             raise ValueError(f"Unsupported provider: {self.provider}")
             
-    def generate(self, prompt, max_tokens=2000, temperature=0.7):
-        """Generate content using the appropriate API"""
+    def _pool_limits(self):
+        """Connection pool limits for the provider HTTP clients"""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+    
+    def _pool_timeout(self):
+        """Request timeouts for the provider HTTP clients"""
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+    
+    @property
+    def model(self):
+        """Model name used for the configured provider"""
+        if self.provider == "anthropic":
+            return ANTHROPIC_MODEL
+        if self.provider == "mock":
+            return MOCK_MODEL
+        return OPENAI_MODEL
+    
+    def _cache_key(self, prompt, max_tokens, temperature, prefix=None):
+        """Response cache key for a request, or None when it isn't cached"""
+        if self.cache is None or not self.cache.caches(temperature):
+            return None
+        return self.cache.make_key(self.provider, self.model, (prefix or "") + prompt, temperature, max_tokens)
+    
+    def _estimate_request_tokens(self, prompt, max_tokens, prefix=None):
+        """Token budget a request may consume (prompt plus the completion ceiling)"""
+        return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prefix or "") + estimate_tokens(prompt) + max_tokens
+    
+    def _openai_messages(self, prompt, prefix=None):
+        """Chat messages for OpenAI; the stable prefix goes first so its automatic prompt caching applies"""
+        system = f"{SYSTEM_PROMPT}\n{prefix}" if prefix else SYSTEM_PROMPT
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _anthropic_system(self, prefix=None):
+        """System prompt for Anthropic, with the stable prefix marked for prompt caching"""
+        if not prefix:
+            return SYSTEM_PROMPT
+        return [
+            {"type": "text", "text": SYSTEM_PROMPT},
+            {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}
+        ]
+    
+    def _record_usage(self, usage):
+        """Add the prompt-cache hits and misses from a response's usage to the totals"""
+        if usage is None:
+            return
+        if hasattr(usage, "prompt_tokens"):
+            # OpenAI counts cached tokens inside prompt_tokens
+            details = getattr(usage, "prompt_tokens_details", None)
+            hit = getattr(details, "cached_tokens", 0) or 0
+            written = 0
+            miss = (usage.prompt_tokens or 0) - hit
+        else:
+            # Anthropic reports cache reads and writes apart from the uncached input
+            hit = getattr(usage, "cache_read_input_tokens", 0) or 0
+            written = getattr(usage, "cache_creation_input_tokens", 0) or 0
+            miss = (getattr(usage, "input_tokens", 0) or 0) + written
+        with self._usage_lock:
+            self.prompt_cache_stats["requests"] += 1
+            self.prompt_cache_stats["cache_hit_tokens"] += hit
+            self.prompt_cache_stats["cache_miss_tokens"] += miss
+            self.prompt_cache_stats["cache_write_tokens"] += written
+            
+    def prompt_cache_report(self):
+        """Prompt-cache totals plus the fraction of input tokens served from the cache"""
+        with self._usage_lock:
+            report = dict(self.prompt_cache_stats)
+        total = report["cache_hit_tokens"] + report["cache_miss_tokens"]
+        report["hit_rate"] = report["cache_hit_tokens"] / total if total else 0.0
+        return report
+    
+    @staticmethod
+    def _request_options(timeout):
+        """Per-request SDK options; bounds the request by the time left before the deadline"""
+        return {"timeout": timeout} if timeout is not None else {}
+    
+    def _check_open(self):
+        """Refuse to generate once the client has been closed"""
+        if self.closed:
+            raise RuntimeError("APIClient has been closed")
+            
+    def close(self):
+        """Close the pooled connections held by the sync client"""
+        if self.client is not None and hasattr(self.client, "close"):
+            self.client.close()
+        if self._http_client is not None:
+            self._http_client.close()
+        self.client = None
+        self._http_client = None
+        self.closed = True
+        
+    async def aclose(self):
+        """Close the pooled connections held by the async and sync clients
+        
+        Must be awaited on the event loop that made the async calls: only that
+        loop's async client can be closed here. Clients of loops that have
+        since closed are dropped; those of other running loops are left open.
+        """
+        self._drop_closed_loops()
+        entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            async_client, async_http_client = entry
+            if hasattr(async_client, "close"):
+                await async_client.close()
+            await async_http_client.aclose()
+        self.close()
+        
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+            
+    def generate(self, prompt, max_tokens=2000, temperature=0.7, prefix=None):
+        """Generate content using the appropriate API
+        
+        prefix is stable instruction text sent ahead of the prompt and marked
+        for the provider's prompt cache where supported.
+        """
+        self._check_open()
+        
+        cache_key = self._cache_key(prompt, max_tokens, temperature, prefix)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+                
         try:
-            if self.provider == "openai":
-                return self._generate_openai(prompt, max_tokens, temperature)
-            elif self.provider == "anthropic":
-                return self._generate_anthropic(prompt, max_tokens, temperature)
+            response = call_with_retries(
+                lambda timeout: self._generate_once(prompt, max_tokens, temperature, timeout, prefix),
+                self.retry_policy,
+                self.latency
+            )
         except Exception as e:
             print(f"API Error: {str(e)}")
             raise
+            
+        if cache_key and response:
+            self.cache.put(cache_key, response)
+        return response
     
-    def _generate_openai(self, prompt, max_tokens=2000, temperature=0.7):
+    def _generate_once(self, prompt, max_tokens=2000, temperature=0.7, timeout=None, prefix=None):
+        """Make one rate-limited provider call"""
+        with self.rate_limiter.slot(self._estimate_request_tokens(prompt, max_tokens, prefix)):
+            if self.provider == "openai":
+                return self._generate_openai(prompt, max_tokens, temperature, timeout, prefix)
+            elif self.provider == "anthropic":
+                return self._generate_anthropic(prompt, max_tokens, temperature, timeout, prefix)
+            elif self.provider == "mock":
+                return self.client.complete((prefix or "") + prompt, max_tokens, temperature, timeout)
+    
+    def _generate_openai(self, prompt, max_tokens=2000, temperature=0.7, timeout=None, prefix=None):
         """Generate content using OpenAI API"""
         try:
-            # Try using newer OpenAI client
-            if hasattr(openai, 'chat'):
-                # Newer version of the OpenAI library
-                response = openai.chat.completions.create(
-                    model="gpt-4",  # You can also use "gpt-3.5-turbo" for a less expensive option
-                    messages=[
-                        {"role": "system", "content": "You are a creative system that generates unique artifacts with ASCII art and detailed descriptions"},
-                        {"role": "user", "content": prompt}
-                    ],
+            if self.client is not None:
+                # Newer version of the OpenAI library, using the pooled client
+                response = self.client.chat.completions.create(
+                    model=OPENAI_MODEL,
+                    messages=self._openai_messages(prompt, prefix),
                     max_tokens=max_tokens,
-                    temperature=temperature
+                    temperature=temperature,
+                    **self._request_options(timeout)
                 )
+                self._record_usage(getattr(response, "usage", None))
                 return response.choices[0].message.content
             else:
                 # Older version of the OpenAI library
                 response = openai.ChatCompletion.create(
-                    model="gpt-4",  # You can also use "gpt-3.5-turbo" for a less expensive option
-                    messages=[
-                        {"role": "system", "content": "You are a creative system that generates unique artifacts with ASCII art and detailed descriptions"},
-                        {"role": "user", "content": prompt}
-                    ],
+                    model=OPENAI_MODEL,
+                    messages=self._openai_messages(prompt, prefix),
                     max_tokens=max_tokens,
                     temperature=temperature
                 )
@@ -76,29 +305,29 @@ class APIClient:
             print(f"OpenAI API Error: {str(e)}")
             raise
     
-    def _generate_anthropic(self, prompt, max_tokens=2000, temperature=0.7):
+    def _generate_anthropic(self, prompt, max_tokens=2000, temperature=0.7, timeout=None, prefix=None):
         """Generate content using Anthropic API"""
         try:
-            system_prompt = "You are a creative system that generates unique artifacts with ASCII art and detailed descriptions."
-            
             # Call the API using Messages API (newer versions)
             try:
                 response = self.anthropic_client.messages.create(
-                    model="claude-3-opus-20240229",
-                    system=system_prompt,
+                    model=ANTHROPIC_MODEL,
+                    system=self._anthropic_system(prefix),
                     max_tokens=max_tokens,
                     temperature=temperature,
                     messages=[
                         {"role": "user", "content": prompt}
-                    ]
+                    ],
+                    **self._request_options(timeout)
                 )
+                self._record_usage(getattr(response, "usage", None))
                 return response.content[0].text
             except (AttributeError, TypeError) as e:
                 # For older versions of the Anthropic client, try completions API
                 print("Falling back to older Anthropic API format")
                 response = self.anthropic_client.completions.create(
-                    model="claude-3-opus-20240229",
-                    prompt=f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}",
+                    model=ANTHROPIC_MODEL,
+                    prompt=f"{anthropic.HUMAN_PROMPT} {prefix or ''}{prompt}{anthropic.AI_PROMPT}",
                     max_tokens_to_sample=max_tokens,
                     temperature=temperature
                 )
@@ -106,19 +335,258 @@ class APIClient:
         except Exception as e:
             print(f"Anthropic API Error: {str(e)}")
             raise
+            
+    def generate_stream(self, prompt, max_tokens=2000, temperature=0.7, prefix=None):
+        """Generate content, yielding text chunks as the provider streams them"""
+        self._check_open()
+        
+        cache_key = self._cache_key(prompt, max_tokens, temperature, prefix)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+                
+        attempt = 0
+        while True:
+            chunks = []
+            try:
+                with self.rate_limiter.slot(self._estimate_request_tokens(prompt, max_tokens, prefix)):
+                    if self.provider == "openai":
+                        stream = self._stream_openai(prompt, max_tokens, temperature, prefix)
+                    elif self.provider == "anthropic":
+                        stream = self._stream_anthropic(prompt, max_tokens, temperature, prefix)
+                    elif self.provider == "mock":
+                        stream = self.client.stream((prefix or "") + prompt, max_tokens, temperature)
+                    for chunk in stream:
+                        chunks.append(chunk)
+                        yield chunk
+                break
+            except Exception as e:
+                attempt += 1
+                # Once text has reached the caller a retry would duplicate it
+                if chunks or attempt >= self.retry_policy.max_attempts or not is_retryable(e):
+                    print(f"API Error: {str(e)}")
+                    raise
+                delay = self.retry_policy.backoff_delay(attempt - 1, e)
+                print(f"Transient API error ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+            
+        # Only a stream that ran to completion is worth caching
+        if cache_key and chunks:
+            self.cache.put(cache_key, "".join(chunks))
+            
+    def _stream_openai(self, prompt, max_tokens=2000, temperature=0.7, prefix=None):
+        """Stream content using OpenAI API"""
+        if self.client is None:
+            # Older versions of the OpenAI library: deliver the whole completion as one chunk
+            yield self._generate_openai(prompt, max_tokens, temperature, prefix=prefix)
+            return
+            
+        try:
+            stream = self.client.chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=self._openai_messages(prompt, prefix),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True}  # usage arrives on a final chunk with no choices
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                elif getattr(chunk, "usage", None) is not None:
+                    self._record_usage(chunk.usage)
+        except Exception as e:
+            print(f"OpenAI API Error: {str(e)}")
+            raise
+            
+    def _stream_anthropic(self, prompt, max_tokens=2000, temperature=0.7, prefix=None):
+        """Stream content using Anthropic API"""
+        try:
+            with self.client.messages.stream(
+                model=ANTHROPIC_MODEL,
+                system=self._anthropic_system(prefix),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ) as stream:
+                for text in stream.text_stream:
+                    yield text
+                self._record_usage(stream.get_final_message().usage)
+        except Exception as e:
+            print(f"Anthropic API Error: {str(e)}")
+            raise
+            
+    async def agenerate(self, prompt, max_tokens=2000, temperature=0.7, prefix=None):
+        """Generate content without blocking the event loop"""
+        self._check_open()
+        
+        cache_key = self._cache_key(prompt, max_tokens, temperature, prefix)
+        if cache_key:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return cached
+                
+        try:
+            response = await acall_with_retries(
+                lambda timeout: self._agenerate_once(prompt, max_tokens, temperature, timeout, prefix),
+                self.retry_policy,
+                self.latency
+            )
+        except Exception as e:
+            print(f"API Error: {str(e)}")
+            raise
+            
+        if cache_key and response:
+            await asyncio.to_thread(self.cache.put, cache_key, response)
+        return response
+    
+    async def _agenerate_once(self, prompt, max_tokens=2000, temperature=0.7, timeout=None, prefix=None):
+        """Make one rate-limited async provider call"""
+        async with self.rate_limiter.aslot(self._estimate_request_tokens(prompt, max_tokens, prefix)):
+            if self.provider == "openai":
+                return await self._agenerate_openai(prompt, max_tokens, temperature, timeout, prefix)
+            elif self.provider == "anthropic":
+                return await self._agenerate_anthropic(prompt, max_tokens, temperature, timeout, prefix)
+            elif self.provider == "mock":
+                return await self.client.acomplete((prefix or "") + prompt, max_tokens, temperature, timeout)
+            
+    def _drop_closed_loops(self):
+        """Forget async clients whose event loop has closed; their connections died with it"""
+        for loop in [loop for loop in self._async_clients if loop.is_closed()]:
+            del self._async_clients[loop]
+    
+    def _get_async_client(self):
+        """The provider's async SDK client for the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is None:
+            self._drop_closed_loops()
+            async_http_client = httpx.AsyncClient(limits=self._pool_limits(), timeout=self._pool_timeout())
+            if self.provider == "openai":
+                async_client = openai.AsyncOpenAI(api_key=self.api_key, http_client=async_http_client, max_retries=0)
+            else:
+                async_client = anthropic.AsyncAnthropic(api_key=self.api_key, http_client=async_http_client, max_retries=0)
+            entry = self._async_clients[loop] = (async_client, async_http_client)
+        return entry[0]
+    
+    async def _agenerate_openai(self, prompt, max_tokens=2000, temperature=0.7, timeout=None, prefix=None):
+        """Generate content using the async OpenAI client"""
+        if not hasattr(openai, "AsyncOpenAI"):
+            # Older library versions have no async client; keep the loop free with a worker thread
+            return await asyncio.to_thread(self._generate_openai, prompt, max_tokens, temperature, timeout, prefix)
+            
+        try:
+            response = await self._get_async_client().chat.completions.create(
+                model=OPENAI_MODEL,
+                messages=self._openai_messages(prompt, prefix),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **self._request_options(timeout)
+            )
+            self._record_usage(getattr(response, "usage", None))
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"OpenAI API Error: {str(e)}")
+            raise
+    
+    async def _agenerate_anthropic(self, prompt, max_tokens=2000, temperature=0.7, timeout=None, prefix=None):
+        """Generate content using the async Anthropic client"""
+        if not hasattr(anthropic, "AsyncAnthropic"):
+            # Older library versions have no async client; keep the loop free with a worker thread
+            return await asyncio.to_thread(self._generate_anthropic, prompt, max_tokens, temperature, timeout, prefix)
+            
+        try:
+            response = await self._get_async_client().messages.create(
+                model=ANTHROPIC_MODEL,
+                system=self._anthropic_system(prefix),
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                **self._request_options(timeout)
+            )
+            self._record_usage(getattr(response, "usage", None))
+            return response.content[0].text
+        except Exception as e:
+            print(f"Anthropic API Error: {str(e)}")
+            raise
+
+class BatchResult:
+    """Per-slot outcome of a batch generation
+    
+    Each requested rarity gets a slot whose status is "ok" (artifact generated),
+    "malformed" (a section came back but failed to parse), "missing" (the
+    response never reached it) or "failed" (the request raised).
+    """
+    
+    def __init__(self, rarities):
+        self.rarities = list(rarities)
+        self.slots = [{"status": "missing", "artifact": None, "raw": None, "error": None} for _ in self.rarities]
+        
+    def set_ok(self, index, artifact):
+        self.slots[index] = {"status": "ok", "artifact": artifact, "raw": None, "error": None}
+        
+    def set_malformed(self, index, raw):
+        self.slots[index] = {"status": "malformed", "artifact": None, "raw": raw, "error": None}
+        
+    def set_failed(self, index, error):
+        self.slots[index] = {"status": "failed", "artifact": None, "raw": None, "error": error}
+        
+    @property
+    def artifacts(self):
+        """Successfully generated artifacts, in slot order"""
+        return [slot["artifact"] for slot in self.slots if slot["status"] == "ok"]
+    
+    @property
+    def errors(self):
+        """Exceptions raised by failed requests"""
+        return [slot["error"] for slot in self.slots if slot["error"] is not None]
+    
+    def failed_indices(self):
+        """Indices of slots without an artifact"""
+        return [i for i, slot in enumerate(self.slots) if slot["status"] != "ok"]
+    
+    def failed_rarities(self):
+        """Rarities of the slots without an artifact"""
+        return [self.rarities[i] for i in self.failed_indices()]
 
 class DeepVoid:
     """Generates artifacts from the void using AI APIs"""
     
-    def __init__(self, api_client):
+    def __init__(self, api_client, max_workers=4, prompt_library=None):
         """Initialize with an API client"""
         from prompt_library import PromptLibrary
         
         self.api_client = api_client
-        self.prompt_library = PromptLibrary()
+        # Every DeepVoid shares one library unless given its own
+        self.prompt_library = prompt_library or PromptLibrary.shared()
+        self.max_workers = max_workers  # Upper bound on parallel requests in concurrent batches
         
     def generate_single(self, rarity=None, category=None):
         """Generate a single artifact"""
+        rarity, category, prompt_template = self._prepare_single(rarity, category)
+        
+        # Generate content
+        response = self.api_client.generate(prompt_template["suffix"], prefix=prompt_template["prefix"])
+        
+        return self._build_single(response, rarity, category)
+    
+    async def agenerate_single(self, rarity=None, category=None):
+        """Generate a single artifact without blocking the event loop"""
+        rarity, category, prompt_template = self._prepare_single(rarity, category)
+        
+        # Generate content
+        response = await self.api_client.agenerate(prompt_template["suffix"], prefix=prompt_template["prefix"])
+        
+        return self._build_single(response, rarity, category)
+    
+    def _prepare_single(self, rarity, category):
+        """Pick rarity and category if needed and build the prompt for one artifact"""
         if rarity is None:
             rarity = Rarity.weighted_random()
             
@@ -128,18 +596,22 @@ class DeepVoid:
         # Get prompt for the specified rarity and category
         prompt_template = self.prompt_library.get_prompt_for_category_and_rarity(category, rarity)
         
-        # Generate content
-        response = self.api_client.generate(prompt_template["prompt"])
-        
+        return rarity, category, prompt_template
+    
+    def _build_single(self, response, rarity, category):
+        """Turn a single-artifact response into an artifact with metadata"""
         # Parse the response
         artifact = self._parse_artifact_response(response)
         
-        # Add metadata
+        return self._add_metadata(artifact, rarity, category)
+    
+    def _add_metadata(self, artifact, rarity=None, category=None):
+        """Fill in id, requested rarity/category and value on a parsed artifact"""
         if not artifact.get("id"):
             artifact["id"] = generate_id()
-        if not artifact.get("rarity"):
+        if not artifact.get("rarity") and rarity is not None:
             artifact["rarity"] = rarity.value if isinstance(rarity, Rarity) else rarity
-        if not artifact.get("category"):
+        if not artifact.get("category") and category is not None:
             artifact["category"] = category.value if isinstance(category, Category) else category
             
         # Calculate value based on rarity
@@ -147,86 +619,220 @@ class DeepVoid:
         
         return artifact
     
-    def generate_batch(self, num_artifacts=5, rarities=None):
-        """Generate multiple artifacts in a single API call"""
+    def stream_single(self, rarity=None, category=None):
+        """Generate a single artifact, yielding (field, value) events as its fields stream in
+        
+        NAME, CATEGORY and RARITY arrive first, then the ASCII art, then the
+        description, and finally ("artifact", dict) with the finished artifact.
+        """
+        rarity, category, prompt_template = self._prepare_single(rarity, category)
+        
+        parser = ArtifactStreamParser()
+        for field, value in self._stream_events(prompt_template["suffix"], parser, prompt_template["prefix"]):
+            if field == "artifact":
+                yield field, self._add_metadata(value, rarity, category)
+            elif field == "malformed":
+                print("Warning: Failed to parse complete artifact. Missing required fields.")
+            else:
+                yield field, value
+    
+    def stream_batch(self, num_artifacts=5, rarities=None):
+        """Generate a batch in one streamed call, yielding each artifact as soon as its divider arrives"""
         # Determine rarities if not specified
         if rarities is None:
             rarities = [Rarity.weighted_random() for _ in range(num_artifacts)]
             
-        # Create batch prompt
-        batch_prompt = self.prompt_library.create_batch_prompt(num_artifacts, rarities)
+        prefix, batch_prompt = self.prompt_library.create_batch_prompt_parts(len(rarities), rarities)
         
-        # Generate content
-        response = self.api_client.generate(batch_prompt)
-        
-        # Parse batch response
-        artifacts = self._parse_batch_response(response)
-        
-        # Add metadata and calculate values
-        for i, artifact in enumerate(artifacts):
-            if not artifact.get("id"):
-                artifact["id"] = generate_id()
-            if not artifact.get("rarity") and i < len(rarities):
-                rarity = rarities[i]
-                artifact["rarity"] = rarity.value if isinstance(rarity, Rarity) else rarity
-            artifact["value"] = self._calculate_value(artifact)
+        parser = ArtifactStreamParser()
+        index = 0
+        for field, value in self._stream_events(batch_prompt, parser, prefix):
+            if field == "artifact":
+                rarity = rarities[index] if index < len(rarities) else None
+                yield self._add_metadata(value, rarity)
+            elif field == "malformed":
+                print("Warning: Failed to parse complete artifact. Missing required fields.")
+            if field in ("artifact", "malformed"):
+                index += 1
+    
+    def _stream_events(self, prompt, parser, prefix=None):
+        """Feed a streamed response through an incremental parser"""
+        for chunk in self.api_client.generate_stream(prompt, prefix=prefix):
+            yield from parser.feed(chunk)
+        yield from parser.close()
+    
+    def generate_batch(self, num_artifacts=5, rarities=None, concurrent=False, chunk_size=1):
+        """Generate multiple artifacts in a single API call, or fanned out across a worker pool
+        
+        Slots that fail are regenerated once; only the artifacts that made it are
+        returned. Use generate_batch_result() to see which slots failed.
+        """
+        result = self.generate_batch_result(num_artifacts, rarities, concurrent, chunk_size)
+        
+        # Nothing at all came back: surface the underlying error to the caller
+        if not result.artifacts and result.errors:
+            raise result.errors[-1]
             
-        return artifacts
+        return result.artifacts
+    
+    def generate_batch_result(self, num_artifacts=5, rarities=None, concurrent=False, chunk_size=1, salvage=True):
+        """Generate a batch and report the outcome of every requested slot"""
+        # Determine rarities if not specified
+        if rarities is None:
+            rarities = [Rarity.weighted_random() for _ in range(num_artifacts)]
+            
+        result = BatchResult(rarities)
+        indices = list(range(len(rarities)))
+        
+        if concurrent and len(rarities) > 1:
+            chunk_size = max(1, chunk_size)
+            self._run_chunks(result, [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)])
+        else:
+            self._generate_chunk(result, indices)
+            
+        if salvage:
+            # One request per failed slot, all at once, so salvage costs about one extra round trip
+            self._run_chunks(result, [[i] for i in result.failed_indices()])
+            
+        return result
+    
+    def _run_chunks(self, result, chunks):
+        """Generate several chunks of a batch in parallel on the worker pool"""
+        if not chunks:
+            return
+        workers = max(1, min(self.max_workers, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda chunk: self._generate_chunk(result, chunk), chunks))
+    
+    def _generate_chunk(self, result, indices):
+        """Generate the artifacts for some slots of a batch with one API call"""
+        rarities = [result.rarities[i] for i in indices]
+        try:
+            if len(indices) == 1:
+                # A chunk of one is just a single artifact, so use the focused prompt
+                rarity, category, prompt_template = self._prepare_single(rarities[0], None)
+                response = self.api_client.generate(prompt_template["suffix"], prefix=prompt_template["prefix"])
+            else:
+                prefix, batch_prompt = self.prompt_library.create_batch_prompt_parts(len(rarities), rarities)
+                response = self.api_client.generate(batch_prompt, prefix=prefix)
+        except Exception as e:
+            for i in indices:
+                result.set_failed(i, e)
+            return
+            
+        if len(indices) == 1:
+            self._record_sections(result, indices, [(self._parse_artifact_response(response), response)], category)
+        else:
+            self._record_sections(result, indices, self._parse_batch_sections(response))
+    
+    def _record_sections(self, result, indices, sections, category=None):
+        """Match parsed sections to batch slots in order and record each outcome"""
+        for position, i in enumerate(indices):
+            if position >= len(sections):
+                # The response ran out before reaching this slot
+                continue
+            artifact, raw = sections[position]
+            if artifact:
+                result.set_ok(i, self._add_metadata(artifact, result.rarities[i], category))
+            else:
+                result.set_malformed(i, raw)
+    
+    async def agenerate_batch(self, num_artifacts=5, rarities=None, concurrent=False, chunk_size=1):
+        """Generate multiple artifacts without blocking the event loop"""
+        result = await self.agenerate_batch_result(num_artifacts, rarities, concurrent, chunk_size)
+        
+        if not result.artifacts and result.errors:
+            raise result.errors[-1]
+            
+        return result.artifacts
+    
+    async def agenerate_batch_result(self, num_artifacts=5, rarities=None, concurrent=False, chunk_size=1, salvage=True):
+        """Async version of generate_batch_result()"""
+        # Determine rarities if not specified
+        if rarities is None:
+            rarities = [Rarity.weighted_random() for _ in range(num_artifacts)]
+            
+        result = BatchResult(rarities)
+        indices = list(range(len(rarities)))
+        
+        if concurrent and len(rarities) > 1:
+            chunk_size = max(1, chunk_size)
+            await self._arun_chunks(result, [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)])
+        else:
+            await self._agenerate_chunk(result, indices)
+            
+        if salvage:
+            await self._arun_chunks(result, [[i] for i in result.failed_indices()])
+            
+        return result
+    
+    async def _arun_chunks(self, result, chunks):
+        """Generate several chunks of a batch concurrently on the event loop"""
+        # Bound in-flight requests the same way the thread pool does
+        semaphore = asyncio.Semaphore(max(1, self.max_workers))
+        
+        async def run_chunk(chunk):
+            async with semaphore:
+                await self._agenerate_chunk(result, chunk)
+        
+        await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+    
+    async def _agenerate_chunk(self, result, indices):
+        """Generate the artifacts for some slots of a batch with one async API call"""
+        rarities = [result.rarities[i] for i in indices]
+        try:
+            if len(indices) == 1:
+                rarity, category, prompt_template = self._prepare_single(rarities[0], None)
+                response = await self.api_client.agenerate(prompt_template["suffix"], prefix=prompt_template["prefix"])
+            else:
+                prefix, batch_prompt = self.prompt_library.create_batch_prompt_parts(len(rarities), rarities)
+                response = await self.api_client.agenerate(batch_prompt, prefix=prefix)
+        except Exception as e:
+            for i in indices:
+                result.set_failed(i, e)
+            return
+            
+        if len(indices) == 1:
+            self._record_sections(result, indices, [(self._parse_artifact_response(response), response)], category)
+        else:
+            self._record_sections(result, indices, self._parse_batch_sections(response))
     
     def _parse_artifact_response(self, response):
         """Parse a single artifact from API response using structured markers."""
-        artifact = {}
-
-        # Use regex to find sections based on the new format
-        name_match = re.search(r'^NAME:\s*(.+)$', response, re.MULTILINE)
-        if name_match:
-            artifact["name"] = name_match.group(1).strip()
-
-        category_match = re.search(r'^CATEGORY:\s*(.+)$', response, re.MULTILINE)
-        if category_match:
-            artifact["category"] = category_match.group(1).strip()
-
-        rarity_match = re.search(r'^RARITY:\s*(.+)$', response, re.MULTILINE)
-        if rarity_match:
-            artifact["rarity"] = rarity_match.group(1).strip()
-
-        # Find the ASCII block using the fences
-        ascii_match = re.search(r'^ASCII_ART:\s*\n```ascii\n(.+?)\n```', response, re.DOTALL | re.MULTILINE)
-        if ascii_match:
-            artifact["ascii_art"] = ascii_match.group(1).strip()
-
-        # Find the Description block
-        # Look for DESCRIPTION: followed by potentially whitespace and then the content
-        description_match = re.search(r'^DESCRIPTION:\s*\n(.+)', response, re.DOTALL | re.MULTILINE)
-        if description_match:
-            artifact["description"] = description_match.group(1).strip()
+        sections = parse_artifacts(response)
 
         # Basic validation - ensure required fields are present
-        if not artifact.get("name") or not artifact.get("ascii_art") or not artifact.get("description"):
-            print("Warning: Failed to parse complete artifact. Missing required fields.")
-            print("--- Raw Response ---")
-            print(response)
-            print("--------------------")
+        if not sections or not sections[0].complete:
+            self._warn_malformed(response)
             return {} # Return empty dict for incomplete artifacts
 
-        return artifact
+        return dict(sections[0].fields)
+
+    def _warn_malformed(self, raw):
+        """Report a response section that could not be parsed into a full artifact"""
+        print("Warning: Failed to parse complete artifact. Missing required fields.")
+        print("--- Raw Response ---")
+        print(raw)
+        print("--------------------")
 
     def _parse_batch_response(self, response):
         """Parse multiple artifacts from a batch response, split by divider."""
-        # Split by the divider defined in create_batch_prompt
-        sections = response.split('----------')
+        # Only add successfully parsed artifacts
+        return [artifact for artifact, _ in self._parse_batch_sections(response) if artifact]
 
-        artifacts = []
-        for section in sections:
-            if not section.strip():
-                continue
-
-            # Parse each section as a single artifact response
-            artifact = self._parse_artifact_response(section)
-            if artifact:  # Only add successfully parsed artifacts
-                artifacts.append(artifact)
+    def _parse_batch_sections(self, response):
+        """Parse every section of a batch response as (artifact, raw section); artifact is {} if malformed"""
+        # One scan over the whole response; sections are split on the divider from create_batch_prompt
+        parsed = []
+        for section in parse_artifacts(response):
+            raw = response[section.start:section.end]
+            if section.complete:
+                parsed.append((dict(section.fields), raw))
+            else:
+                self._warn_malformed(raw)
+                parsed.append(({}, raw))
 
-        return artifacts
+        return parsed
 
     
     def _calculate_value(self, artifact):
@@ -0,0 +1,152 @@
+import sys
+from utils import Rarity, Category
+
+_RARITIES = {rarity.value: rarity for rarity in Rarity}
+_CATEGORIES = {category.value: category for category in Category}
+
+# Fields with their own slot, in the order they appear when the record is read as a dict
+FIELDS = ("id", "name", "rarity", "category", "value", "ascii_art", "description", "body")
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+def _code(value, members):
+    """Enum member for a known rarity/category string, else the interned string itself"""
+    if value is None or not isinstance(value, str):
+        return value
+    return members.get(value) or sys.intern(value)
+
+def _plain(value):
+    # _value_ skips the Enum.value descriptor, which is noticeably slower in hot loops
+    return value._value_ if isinstance(value, (Rarity, Category)) else value
+
+
+class Artifact:
+    """Compact record for a collected artifact
+
+    Rarity and category are held as Rarity/Category members (or an interned
+    string for values outside the enums) and ids and names are interned, so a
+    large collection shares one copy of every repeated string. Unset fields are
+    None; keys outside FIELDS are kept in a small `extra` dict.
+
+    The record reads and writes like the dict it replaces: artifact["rarity"]
+    and artifact.get("rarity") return the plain string, and dict(artifact)
+    gives back the dict saved to disk. Attribute access returns the coded
+    values (artifact.rarity is a Rarity member).
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, id=None, name=None, rarity=None, category=None, value=None,
+                 ascii_art=None, description=None, body=None, extra=None):
+        self.id = _intern(id)
+        self.name = _intern(name)
+        self.rarity = _code(rarity, _RARITIES)
+        self.category = _code(category, _CATEGORIES)
+        self.value = value
+        self.ascii_art = ascii_art
+        self.description = description
+        self.body = body  # body store reference when ascii_art/description live on disk
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Record for an artifact dict, as produced by DeepVoid or read from a save"""
+        if isinstance(data, cls):
+            return data
+        extra = {key: value for key, value in data.items() if key not in FIELDS}
+        return cls(
+            data.get("id"), data.get("name"), data.get("rarity"), data.get("category"), data.get("value"),
+            data.get("ascii_art"), data.get("description"), data.get("body"), extra
+        )
+
+    def to_dict(self):
+        return dict(self.items())
+
+    # --- dict interface ---
+
+    def keys(self):
+        keys = [field for field in FIELDS if getattr(self, field) is not None]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def items(self):
+        items = [(field, _plain(getattr(self, field))) for field in FIELDS if getattr(self, field) is not None]
+        if self.extra:
+            items.extend(self.extra.items())
+        return items
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __contains__(self, key):
+        if key in FIELDS:
+            return getattr(self, key) is not None
+        return bool(self.extra) and key in self.extra
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return _plain(value)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in FIELDS:
+            value = getattr(self, key)
+            return default if value is None else _plain(value)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if key == "rarity":
+            self.rarity = _code(value, _RARITIES)
+        elif key == "category":
+            self.category = _code(value, _CATEGORIES)
+        elif key in ("id", "name"):
+            setattr(self, key, _intern(value))
+        elif key in FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in FIELDS:
+            setattr(self, key, None)
+        else:
+            del self.extra[key]
+            if not self.extra:
+                self.extra = None
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def __eq__(self, other):
+        if isinstance(other, (Artifact, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Artifact({self.to_dict()!r})"
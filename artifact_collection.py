@@ -0,0 +1,256 @@
+from bisect import bisect_right
+from collections.abc import MutableMapping
+from artifact import Artifact
+
+# Lower edges of the value buckets used by the value index; the last bucket is open-ended
+VALUE_BUCKET_EDGES = (0, 10, 25, 50, 100, 250, 500, 1000)
+
+def value_bucket(value):
+    """Index of the value bucket an artifact's base value falls into"""
+    try:
+        value = float(value or 0)
+    except (TypeError, ValueError):
+        value = 0
+    return max(0, bisect_right(VALUE_BUCKET_EDGES, value) - 1)
+
+
+class ArtifactCollection(MutableMapping):
+    """Player collection (id -> artifact) with secondary indexes kept up to date
+
+    Rarity, category and value-bucket indexes are maintained on every add and
+    remove, so grouped views and filtered queries cost O(result) rather than a
+    scan of the whole collection. Each index maps a key to an insertion-ordered
+    dict of artifact ids, so listings keep the order artifacts were collected in.
+
+    Artifacts are stored as compact Artifact records; dicts are converted on
+    the way in. Behaves like the plain dict it replaces. If an artifact's rarity, category
+    or value is changed in place, call reindex() so the indexes follow.
+
+    Once an incremental save backend has called take_changes() or
+    mark_synced(), added, replaced and removed ids are also tracked so it can
+    write only what changed since the last sync. Collections saved some other
+    way don't track anything.
+    """
+
+    def __init__(self, artifacts=None):
+        self._artifacts = {}
+        self._by_rarity = {}
+        self._by_category = {}
+        self._by_value = {}
+        self._index_keys = {}  # id -> (rarity, category, bucket) it is currently indexed under
+        self._changed = {}  # ids added or modified since the last sync, in order
+        self._removed = set()
+        self._synced = False  # False until the collection has been written out or loaded from storage
+        self._tracking = False  # True once a save backend consumes the changes
+        if artifacts:
+            for artifact_id, artifact in artifacts.items():
+                self.add(artifact_id, artifact)
+
+    # --- dict interface ---
+
+    def __getitem__(self, artifact_id):
+        return self._artifacts[artifact_id]
+
+    def __setitem__(self, artifact_id, artifact):
+        self.add(artifact_id, artifact)
+
+    def __delitem__(self, artifact_id):
+        if self.remove(artifact_id) is None:
+            raise KeyError(artifact_id)
+
+    def __iter__(self):
+        return iter(self._artifacts)
+
+    def __len__(self):
+        return len(self._artifacts)
+
+    def __contains__(self, artifact_id):
+        return artifact_id in self._artifacts
+
+    def __repr__(self):
+        return f"ArtifactCollection({len(self._artifacts)} artifacts)"
+
+    def get(self, artifact_id, default=None):
+        return self._artifacts.get(artifact_id, default)
+
+    def keys(self):
+        return self._artifacts.keys()
+
+    def values(self):
+        return self._artifacts.values()
+
+    def items(self):
+        return self._artifacts.items()
+
+    def to_dict(self):
+        """Plain dict of the collection (artifacts as dicts too), for saving"""
+        return {artifact_id: dict(artifact) for artifact_id, artifact in self._artifacts.items()}
+
+    # --- maintenance ---
+
+    def add(self, artifact_id, artifact):
+        """Add or replace an artifact and index it"""
+        artifact = Artifact.from_dict(artifact)
+        if artifact_id in self._artifacts:
+            self._unindex(artifact_id)
+        self._artifacts[artifact_id] = artifact
+        self._index(artifact_id, artifact)
+        if self._tracking:
+            self._changed[artifact_id] = None
+            self._removed.discard(artifact_id)
+
+    def remove(self, artifact_id):
+        """Remove an artifact and drop it from the indexes; returns it, or None"""
+        artifact = self._artifacts.pop(artifact_id, None)
+        if artifact is not None:
+            self._unindex(artifact_id)
+            if self._tracking:
+                self._changed.pop(artifact_id, None)
+                self._removed.add(artifact_id)
+        return artifact
+
+    def reindex(self, artifact_id):
+        """Refresh an artifact's index entries after it was modified in place"""
+        artifact = self._artifacts.get(artifact_id)
+        if artifact is None:
+            return
+        if self._tracking:
+            self._changed[artifact_id] = None
+        keys = self._keys_for(artifact)
+        if keys != self._index_keys.get(artifact_id):
+            self._unindex(artifact_id)
+            self._index(artifact_id, artifact, keys)
+
+    def clear(self):
+        self._artifacts.clear()
+        self._by_rarity.clear()
+        self._by_category.clear()
+        self._by_value.clear()
+        self._index_keys.clear()
+        self.mark_synced(False)
+
+    def take_changes(self):
+        """Return (changed ids, removed ids, full) since the last sync and start tracking afresh
+
+        full is True when the collection has never been synced, meaning the
+        whole collection should replace whatever is stored.
+        """
+        changes = (list(self._changed), list(self._removed), not self._synced)
+        self.mark_synced()
+        return changes
+
+    def mark_synced(self, synced=True):
+        """Forget pending changes, e.g. after loading the collection from storage
+
+        A synced collection starts tracking changes from here on.
+        """
+        self._changed = {}
+        self._removed = set()
+        self._synced = synced
+        if synced:
+            self._tracking = True
+
+    @staticmethod
+    def _keys_for(artifact):
+        return (
+            artifact.get("rarity", "common"),
+            artifact.get("category", "unknown"),
+            value_bucket(artifact.get("value", 0))
+        )
+
+    def _index(self, artifact_id, artifact, keys=None):
+        keys = keys or self._keys_for(artifact)
+        rarity, category, bucket = keys
+        self._by_rarity.setdefault(rarity, {})[artifact_id] = None
+        self._by_category.setdefault(category, {})[artifact_id] = None
+        self._by_value.setdefault(bucket, {})[artifact_id] = None
+        self._index_keys[artifact_id] = keys
+
+    def _unindex(self, artifact_id):
+        keys = self._index_keys.pop(artifact_id, None)
+        if keys is None:
+            return
+        rarity, category, bucket = keys
+        for index, key in ((self._by_rarity, rarity), (self._by_category, category), (self._by_value, bucket)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.pop(artifact_id, None)
+                if not ids:
+                    del index[key]
+
+    # --- queries ---
+
+    def rarities(self):
+        """Rarities present in the collection with their artifact counts"""
+        return {rarity: len(ids) for rarity, ids in self._by_rarity.items()}
+
+    def categories(self):
+        """Categories present in the collection with their artifact counts"""
+        return {category: len(ids) for category, ids in self._by_category.items()}
+
+    def ids_by_rarity(self, rarity):
+        return list(self._by_rarity.get(rarity, ()))
+
+    def ids_by_category(self, category):
+        return list(self._by_category.get(category, ()))
+
+    def group_by_rarity(self):
+        """rarity -> list of artifact ids"""
+        return {rarity: list(ids) for rarity, ids in self._by_rarity.items()}
+
+    def group_by_category(self):
+        """category -> list of artifact ids"""
+        return {category: list(ids) for category, ids in self._by_category.items()}
+
+    def items_by_rarity(self, rarity):
+        """(id, artifact) pairs of one rarity, in collection order"""
+        artifacts = self._artifacts
+        return [(artifact_id, artifacts[artifact_id]) for artifact_id in self._by_rarity.get(rarity, ())]
+
+    def items_by_category(self, category):
+        """(id, artifact) pairs of one category, in collection order"""
+        artifacts = self._artifacts
+        return [(artifact_id, artifacts[artifact_id]) for artifact_id in self._by_category.get(category, ())]
+
+    def _ids_in_value_range(self, min_value, max_value):
+        """Artifact ids whose base value lies in [min_value, max_value]"""
+        low = value_bucket(min_value) if min_value is not None else 0
+        high = value_bucket(max_value) if max_value is not None else len(VALUE_BUCKET_EDGES) - 1
+        ids = {}
+        for bucket in range(low, high + 1):
+            bucket_ids = self._by_value.get(bucket)
+            if not bucket_ids:
+                continue
+            if low < bucket < high:
+                ids.update(bucket_ids)
+                continue
+            # Edge buckets may straddle the range, so check those values individually
+            for artifact_id in bucket_ids:
+                value = self._artifacts[artifact_id].get("value", 0) or 0
+                if (min_value is None or value >= min_value) and (max_value is None or value <= max_value):
+                    ids[artifact_id] = None
+        return ids
+
+    def query(self, rarity=None, category=None, min_value=None, max_value=None):
+        """(id, artifact) pairs matching every given filter
+
+        Starts from the smallest matching index and checks the remaining
+        filters against it, so the cost follows the result size.
+        """
+        candidates = []
+        if rarity is not None:
+            candidates.append(self._by_rarity.get(rarity, {}))
+        if category is not None:
+            candidates.append(self._by_category.get(category, {}))
+        if min_value is not None or max_value is not None:
+            candidates.append(self._ids_in_value_range(min_value, max_value))
+        if not candidates:
+            return list(self._artifacts.items())
+
+        candidates.sort(key=len)
+        smallest, others = candidates[0], candidates[1:]
+        artifacts = self._artifacts
+        return [
+            (artifact_id, artifacts[artifact_id]) for artifact_id in smallest
+            if all(artifact_id in ids for ids in others)
+        ]
@@ -0,0 +1,305 @@
+import re
+
+DIVIDER = "----------"
+
+# Fields every artifact needs before it is worth keeping
+REQUIRED_FIELDS = ("name", "ascii_art", "description")
+
+# Header markers that map directly onto artifact fields
+HEADER_FIELDS = {
+    "NAME": "name",
+    "CATEGORY": "category",
+    "RARITY": "rarity",
+}
+
+# Structural lines of a response, compiled once. Everything between two matches
+# is ASCII art or description text, so a response is scanned in one pass without
+# visiting its body lines one by one. Matching from the newline lets the regex
+# engine jump between candidate lines with a literal search; the first line of
+# a scan has no newline before it and gets its own pattern.
+_STRUCTURAL_LINE = (
+    r'[ \t]*(?:'
+    r'(NAME|CATEGORY|RARITY|ASCII_ART|DESCRIPTION):[ \t]*(.*?)[ \t\r]*'
+    r'|(```)[^\n]*'
+    r'|(' + re.escape(DIVIDER) + r')[^\n]*'
+    r')$'
+)
+FIRST_LINE_PATTERN = re.compile(_STRUCTURAL_LINE, re.MULTILINE)
+LINE_PATTERN = re.compile(r'\n' + _STRUCTURAL_LINE, re.MULTILINE)
+
+# Parser states
+STATE_HEADER = "header"
+STATE_ASCII_FENCE = "ascii_fence"
+STATE_ASCII = "ascii"
+STATE_DESCRIPTION = "description"
+
+def _byte_len(text):
+    """UTF-8 length of a string, skipping the encode for plain ASCII"""
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+class ParsedSection:
+    """One artifact section of a response, with where each field sits in the input
+
+    offsets maps a field name to its (start, end) character offsets in the
+    whole input, and start/end span the section's raw text. byte_offsets holds
+    the same field spans in UTF-8 bytes once add_byte_offsets() has run.
+    """
+
+    __slots__ = ("fields", "offsets", "start", "end", "byte_offsets")
+
+    def __init__(self, fields, offsets, start, end):
+        self.fields = fields
+        self.offsets = offsets
+        self.start = start
+        self.end = end
+        self.byte_offsets = None
+
+    @property
+    def complete(self):
+        """True if every required field was found"""
+        return all(self.fields.get(field) for field in REQUIRED_FIELDS)
+
+
+class ArtifactStreamParser:
+    """Single-pass state machine over the structural lines of artifact responses
+
+    Feed it text chunks as they arrive from the provider. Each call returns the
+    events completed by that chunk as (field, value) tuples:
+
+    - ("name" | "category" | "rarity", text) as soon as the header line is complete
+    - ("ascii_art", text) once the ASCII block is closed
+    - ("description", text) once the artifact's divider (or the end of stream) arrives
+    - ("artifact", dict) with all parsed fields when the artifact is complete
+    - ("malformed", dict) when an artifact ended without its required fields
+
+    With keep_sections=True every finished section is also collected in
+    self.sections as a ParsedSection.
+    """
+
+    def __init__(self, keep_sections=False):
+        self._buffer = ""
+        self.keep_sections = keep_sections
+        self.sections = []
+
+        # Characters consumed before the text currently being scanned
+        self._char_base = 0
+        self._text = None
+        self._reset_artifact(0)
+
+    def _reset_artifact(self, section_start):
+        """Start collecting a fresh artifact"""
+        self.state = STATE_HEADER
+        self.fields = {}
+        self.offsets = {}
+        self._block = []  # text slices of the ASCII art or description being collected
+        self._block_start = None  # span of the block's non-blank text
+        self._block_end = None
+        self._section_start = section_start
+
+    def feed(self, chunk):
+        """Consume a chunk of streamed text and return any completed events"""
+        events = []
+        text = self._buffer + chunk
+
+        # Only whole lines can be classified; keep the trailing partial line buffered
+        cut = text.rfind("\n")
+        if cut == -1:
+            self._buffer = text
+            return events
+        self._buffer = text[cut + 1:]
+
+        self._scan(text[:cut + 1], events)
+        return events
+
+    def close(self):
+        """Flush the final line and artifact once the stream has ended"""
+        events = []
+        if self._buffer:
+            self._scan(self._buffer, events)
+            self._buffer = ""
+        self._finish_artifact(events, self._char_base, self._char_base)
+        return events
+
+    def _scan(self, text, events):
+        """Advance the state machine over a run of complete lines"""
+        self._text = text
+
+        pos = 0
+        first = FIRST_LINE_PATTERN.match(text)
+        if first:
+            self._handle_line(first, events)
+            pos = first.end()
+        for match in LINE_PATTERN.finditer(text, pos):
+            if match.start() > pos:
+                self._add_body(pos, match.start())
+            self._handle_line(match, events)
+            pos = match.end()
+        if pos < len(text):
+            self._add_body(pos, len(text))
+
+        self._char_base += len(text)
+        self._text = None
+
+    def _add_body(self, start, end):
+        """Collect text that sits between structural lines"""
+        if self.state == STATE_HEADER:
+            return
+
+        body = self._text[start:end]
+        stripped = body.strip()
+        if self.state == STATE_ASCII_FENCE:
+            if not stripped:
+                return
+            # No opening fence; the art starts right here
+            self.state = STATE_ASCII
+
+        self._block.append(body)
+        if stripped:
+            if self._block_start is None:
+                self._block_start = self._char_base + start + len(body) - len(body.lstrip())
+            self._block_end = self._char_base + start + len(body.rstrip())
+
+    def _handle_line(self, match, events):
+        """Advance the state machine by one structural line"""
+        # lastindex tells the line kinds apart: 2 marker, 3 fence, 4 divider
+        kind = match.lastindex
+        state = self.state
+
+        if state == STATE_HEADER:
+            if kind == 2:
+                key = match.group(1)
+                field = HEADER_FIELDS.get(key)
+                if field:
+                    value = match.group(2)
+                    if value:
+                        self.fields[field] = value
+                        self.offsets[field] = (self._char_base + match.start(2), self._char_base + match.end(2))
+                        events.append((field, value))
+                elif key == "ASCII_ART":
+                    self.state = STATE_ASCII_FENCE
+                else:
+                    self._start_description(match)
+            elif kind == 4:
+                self._end_section(match, events)
+            return
+
+        if state == STATE_ASCII:
+            if kind == 3:
+                self._finish_ascii(events)
+                self.state = STATE_HEADER
+            elif kind == 2 and match.group(1) == "DESCRIPTION":
+                # Closing fence was left out; the description marker ends the art instead
+                self._finish_ascii(events)
+                self._start_description(match)
+            else:
+                # Markers and dividers inside the art are just part of the picture
+                self._add_body(match.start(), match.end())
+            return
+
+        if kind == 4:
+            self._end_section(match, events)
+        elif state == STATE_ASCII_FENCE and kind == 3:
+            self.state = STATE_ASCII
+        else:
+            self._add_body(match.start(), match.end())
+
+    def _end_section(self, match, events):
+        """Finish the artifact at a divider line"""
+        # The divider line and the newlines around it belong to neither section
+        end = self._char_base + match.start()
+        if match.re is FIRST_LINE_PATTERN and end:
+            end -= 1  # the newline before it closed the previous scan
+        next_start = min(match.end() + 1, len(self._text))
+        self._finish_artifact(events, end, self._char_base + next_start)
+
+    def _start_description(self, match):
+        """Switch to collecting description lines"""
+        self.state = STATE_DESCRIPTION
+        self._block = []
+        self._block_start = None
+        self._block_end = None
+        remainder = match.group(2)
+        if remainder:
+            self._block.append(remainder)
+            self._block_start = self._char_base + match.start(2)
+            self._block_end = self._char_base + match.end(2)
+
+    def _take_block(self):
+        """Joined text of the current block and its byte span, then clear it"""
+        text = "".join(self._block).strip()
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+        span = (self._block_start, self._block_end)
+        self._block = []
+        self._block_start = None
+        self._block_end = None
+        return text, span
+
+    def _finish_ascii(self, events):
+        """Emit the completed ASCII block"""
+        ascii_art, span = self._take_block()
+        if ascii_art:
+            self.fields["ascii_art"] = ascii_art
+            self.offsets["ascii_art"] = span
+            events.append(("ascii_art", ascii_art))
+
+    def _finish_artifact(self, events, section_end, next_section_start):
+        """Emit the description and the finished artifact, then reset"""
+        if self.state == STATE_ASCII:
+            self._finish_ascii(events)
+        elif self.state == STATE_DESCRIPTION:
+            description, span = self._take_block()
+            if description:
+                self.fields["description"] = description
+                self.offsets["description"] = span
+                events.append(("description", description))
+
+        if self.fields:
+            if self.keep_sections:
+                self.sections.append(ParsedSection(self.fields, self.offsets, self._section_start, section_end))
+            if all(self.fields.get(field) for field in REQUIRED_FIELDS):
+                events.append(("artifact", self.fields))
+            else:
+                events.append(("malformed", self.fields))
+
+        self._reset_artifact(next_section_start)
+
+
+def add_byte_offsets(text, sections):
+    """Fill in byte_offsets on parsed sections of text, in UTF-8 bytes
+
+    All field boundaries are converted in one forward pass over the text.
+    """
+    if text.isascii():
+        for section in sections:
+            section.byte_offsets = dict(section.offsets)
+        return sections
+
+    positions = sorted({pos for section in sections for span in section.offsets.values() for pos in span})
+    byte_at = {}
+    char_pos = byte_pos = 0
+    for pos in positions:
+        byte_pos += _byte_len(text[char_pos:pos])
+        char_pos = pos
+        byte_at[pos] = byte_pos
+
+    for section in sections:
+        section.byte_offsets = {
+            field: (byte_at[start], byte_at[end]) for field, (start, end) in section.offsets.items()
+        }
+    return sections
+
+def parse_artifacts(text, byte_offsets=False):
+    """Parse a whole response, one artifact or a batch, in a single linear scan
+
+    Returns a ParsedSection for every section that contained any artifact
+    field. With byte_offsets=True each section also gets its field spans in
+    UTF-8 bytes.
+    """
+    parser = ArtifactStreamParser(keep_sections=True)
+    parser.feed(text)
+    parser.close()
+    if byte_offsets:
+        add_byte_offsets(text, parser.sections)
+    return parser.sections
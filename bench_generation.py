@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+import argparse
+from utils import Rarity
+from api_client import APIClient, DeepVoid
+
+def timed(label, fn):
+    """Run fn once and print how long it took and how many artifacts it produced"""
+    start = time.perf_counter()
+    artifacts = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:7.2f}s  {len(artifacts)} artifacts")
+    return artifacts
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark artifact generation with the mock provider")
+    parser.add_argument("--artifacts", type=int, default=10, help="Artifacts per batch (default: 10)")
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean seconds per artifact in a mock response (default: 0.5)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of mock calls that fail (default: 0)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests per batch (default: 8)")
+    parser.add_argument("--seed", type=int, default=0, help="Mock provider seed (default: 0)")
+    args = parser.parse_args()
+
+    mock_options = {"latency": args.latency, "failure_rate": args.failure_rate, "seed": args.seed}
+    rarities = [Rarity.weighted_random() for _ in range(args.artifacts)]
+
+    with APIClient(provider="mock", mock_options=mock_options) as api_client:
+        deep_void = DeepVoid(api_client, max_workers=args.workers)
+
+        tokens = deep_void.prompt_library.batch_prompt_tokens(rarities)
+        print(f"{'batch prompt tokens':<28} full {tokens['full']}, compact {tokens['compact']}")
+
+        timed("single-call batch", lambda: deep_void.generate_batch(len(rarities), rarities))
+        timed("concurrent fan-out", lambda: deep_void.generate_batch(len(rarities), rarities, concurrent=True))
+        timed("asyncio fan-out", lambda: asyncio.run(
+            deep_void.agenerate_batch(len(rarities), rarities, concurrent=True)
+        ))
+        timed("streamed batch", lambda: list(deep_void.stream_batch(len(rarities), rarities)))
+        
+        # Streaming is about how soon the first artifact can be shown
+        start = time.perf_counter()
+        next(deep_void.stream_batch(len(rarities), rarities))
+        print(f"{'streamed first artifact':<28} {time.perf_counter() - start:7.2f}s")
+
+if __name__ == "__main__":
+    main()
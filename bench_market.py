@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import time
+import argparse
+import numpy as np
+from economy_and_player import (
+    ArtifactEconomy, DEMAND_MIN, DEMAND_MAX, DEMAND_DRIFT, DEMAND_HIGH, DEMAND_LOW, DEMAND_REVERSION
+)
+from market_engine import MarketEngine
+
+def scalar_run(start, noise):
+    """update_market's per-category rule applied to given noise, one value at a time"""
+    demand = [list(row) for row in start]
+    for tick_noise in noise:
+        for market, row in enumerate(demand):
+            for i, current in enumerate(row):
+                change = float(tick_noise[market][i])
+                if current > DEMAND_HIGH:
+                    change -= DEMAND_REVERSION
+                elif current < DEMAND_LOW:
+                    change += DEMAND_REVERSION
+                row[i] = max(DEMAND_MIN, min(DEMAND_MAX, current + change))
+    return np.array(demand)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare ArtifactEconomy.update_market with the vectorized MarketEngine")
+    parser.add_argument("--ticks", type=int, default=1000, help="Ticks per run (default: 1000)")
+    parser.add_argument("--markets", type=int, nargs="+", default=[1, 100, 1000], help="Parallel markets (default: 1 100 1000)")
+    parser.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0)")
+    args = parser.parse_args()
+
+    # Same seed and noise through both implementations must land on the same demand
+    start = MarketEngine(markets=4, seed=args.seed + 1).demand
+    noise = np.random.default_rng(args.seed).uniform(-DEMAND_DRIFT, DEMAND_DRIFT, size=(200,) + start.shape)
+    engine = MarketEngine(markets=4, seed=args.seed, demand=start)
+    if not np.allclose(engine.step(200), scalar_run(start, noise)):
+        print("engine and update_market rules disagree")
+        return
+
+    for markets in args.markets:
+        print(f"\n{markets} market(s), {args.ticks} ticks")
+
+        economies = [ArtifactEconomy() for _ in range(markets)]
+        start_time = time.perf_counter()
+        for _ in range(args.ticks):
+            for economy in economies:
+                economy.update_market()
+        loop = time.perf_counter() - start_time
+        print(f"  {'update_market loop':<22} {loop * 1e3:10.1f}ms")
+
+        engine = MarketEngine(markets=markets, seed=args.seed)
+        start_time = time.perf_counter()
+        history = engine.step(args.ticks, history=True)
+        vectorized = time.perf_counter() - start_time
+        print(f"  {'MarketEngine':<22} {vectorized * 1e3:10.1f}ms")
+        print(f"  speedup {loop / vectorized:.1f}x, mean demand {history.mean():.3f}, "
+              f"range [{history.min():.2f}, {history.max():.2f}]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import re
+import time
+import argparse
+from artifact_parser import parse_artifacts
+from mock_provider import MockProvider
+
+def legacy_parse_artifact(response):
+    """The regex parser DeepVoid used before the single-pass parser, kept as the baseline"""
+    artifact = {}
+
+    name_match = re.search(r'^NAME:\s*(.+)$', response, re.MULTILINE)
+    if name_match:
+        artifact["name"] = name_match.group(1).strip()
+
+    category_match = re.search(r'^CATEGORY:\s*(.+)$', response, re.MULTILINE)
+    if category_match:
+        artifact["category"] = category_match.group(1).strip()
+
+    rarity_match = re.search(r'^RARITY:\s*(.+)$', response, re.MULTILINE)
+    if rarity_match:
+        artifact["rarity"] = rarity_match.group(1).strip()
+
+    ascii_match = re.search(r'^ASCII_ART:\s*\n```ascii\n(.+?)\n```', response, re.DOTALL | re.MULTILINE)
+    if ascii_match:
+        artifact["ascii_art"] = ascii_match.group(1).strip()
+
+    description_match = re.search(r'^DESCRIPTION:\s*\n(.+)', response, re.DOTALL | re.MULTILINE)
+    if description_match:
+        artifact["description"] = description_match.group(1).strip()
+
+    if not artifact.get("name") or not artifact.get("ascii_art") or not artifact.get("description"):
+        return {}
+    return artifact
+
+def legacy_parse_batch(response):
+    return [legacy_parse_artifact(section) for section in response.split('----------') if section.strip()]
+
+def single_pass_parse_batch(response):
+    return [dict(section.fields) if section.complete else {} for section in parse_artifacts(response)]
+
+def build_response(artifacts, seed):
+    """A batch response of the given size, rendered by the mock provider"""
+    categories = ["mystical", "technological", "ancient", "cosmic"]
+    rarities = ["common", "uncommon", "rare", "legendary"]
+    specs = [f"CATEGORY: {categories[i % 4]}\nRARITY: {rarities[i % 4]}" for i in range(artifacts)]
+    return MockProvider(seed=seed).render("\n\n".join(specs))
+
+def bench(label, fn, response, repeat):
+    """Time fn over the response and print the per-call cost"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(response)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<24} {elapsed * 1e6:10.1f}us per response")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the single-pass artifact parser with the old regex parser")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50], help="Artifacts per response (default: 1 10 50)")
+    parser.add_argument("--repeat", type=int, default=200, help="Parses per measurement (default: 200)")
+    parser.add_argument("--seed", type=int, default=0, help="Mock provider seed (default: 0)")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        response = build_response(size, args.seed)
+        print(f"\n{size} artifacts, {len(response.encode('utf-8'))} bytes")
+
+        # Both parsers must agree before their timings mean anything
+        if legacy_parse_batch(response) != single_pass_parse_batch(response):
+            print("  parsers disagree on this response; skipping")
+            continue
+
+        legacy = bench("  regex parser", legacy_parse_batch, response, args.repeat)
+        single = bench("  single-pass parser", single_pass_parse_batch, response, args.repeat)
+        bench("  + byte offsets", lambda text: parse_artifacts(text, byte_offsets=True), response, args.repeat)
+        print(f"  speedup {legacy / single:.2f}x")
+
+if __name__ == "__main__":
+    main()
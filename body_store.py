@@ -0,0 +1,358 @@
+import os
+import sys
+import mmap
+import json
+import hashlib
+import tempfile
+import threading
+from utils import SAVE_DIR
+from compression import resolve_codec, compress, decompress
+
+# Artifact fields kept in the blob file rather than in memory
+BODY_FIELDS = ("ascii_art", "description")
+
+# Header key holding the artifact's body reference. In the plain store it is
+# [offset, ascii_art bytes, description bytes] into bodies.bin; in the
+# deduplicating store it maps each body field to the content hash of its text.
+BODY_REF = "body"
+
+def content_hash(data):
+    """Short content hash of a body, interned so repeated bodies share one key string"""
+    return sys.intern(hashlib.blake2b(data, digest_size=16).hexdigest())
+
+
+class _PackedFile:
+    """Append-only file read back through a read-only memory map (caller holds the store lock)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self._mapped_size = 0
+        self.size = 0
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a+b")
+            self._file.seek(0, os.SEEK_END)
+            self.size = self._file.tell()
+
+    def append(self, data):
+        self._open()
+        offset = self.size
+        self._file.write(data)
+        self.size += len(data)
+        return offset
+
+    def read(self, offset, length):
+        if not length:
+            return b""
+        self._open()
+        end = offset + length
+        if end > self._mapped_size:
+            # Map the file again after it has grown
+            self._file.flush()
+            if end > self.size:
+                raise ValueError(f"body reference past the end of {self.path}")
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped_size = len(self._map)
+        return self._map[offset:end]
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._mapped_size = 0
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class ArtifactBodyStore:
+    """Packed, memory-mapped file of artifact bodies (ASCII art and descriptions)
+
+    Bodies are appended to a single file as UTF-8 and addressed by a reference
+    that lives in the artifact's header, so whatever saves the collection also
+    saves the index. Reads slice a read-only memory map of the file; only the
+    pages actually touched are brought into memory.
+
+    With dedup=True each distinct body text is stored once, optionally
+    compressed, and headers refer to it by content hash. An index of hash ->
+    (offset, length, codec) is appended to bodies.idx. Reference counts are
+    rebuilt as a collection is loaded and dropped as artifacts are sold, and
+    maybe_compact() rewrites the data file without dead bodies once they make
+    up most of it.
+    """
+
+    def __init__(self, path=None, directory=SAVE_DIR, dedup=False, codec="none", compact_ratio=0.5):
+        self.path = path or os.path.join(directory, "bodies.bin")
+        self.dedup = dedup
+        self.codec = resolve_codec(codec)
+        self.compact_ratio = compact_ratio  # dead fraction of the data file that triggers compaction
+        self.index_path = os.path.splitext(self.path)[0] + ".idx"
+
+        self._lock = threading.Lock()
+        self._plain = _PackedFile(self.path)
+
+        # Deduplicated bodies, loaded on first use
+        self._data = None
+        self._index_file = None
+        self._blobs = None  # hash -> [offset, length, codec]
+        self._refs = {}  # hash -> headers currently referring to it
+        self._live_bytes = 0
+        self._dead_bytes = 0
+
+    # --- plain bodies ---
+
+    def append(self, ascii_art, description):
+        """Store a body and return its [offset, ascii_art bytes, description bytes] reference"""
+        ascii_bytes = (ascii_art or "").encode("utf-8")
+        description_bytes = (description or "").encode("utf-8")
+        with self._lock:
+            offset = self._plain.append(ascii_bytes + description_bytes)
+        return [offset, len(ascii_bytes), len(description_bytes)]
+
+    def read(self, ref):
+        """(ascii_art, description) for a plain reference"""
+        offset, ascii_len, description_len = ref
+        with self._lock:
+            data = self._plain.read(offset, ascii_len + description_len)
+        return data[:ascii_len].decode("utf-8"), data[ascii_len:].decode("utf-8")
+
+    # --- deduplicated bodies ---
+
+    def _load_index(self):
+        """Read bodies.idx and open its data file (caller holds the lock)"""
+        if self._blobs is not None:
+            return
+        self._blobs = {}
+        data_name = None
+        good_bytes = 0
+        try:
+            with open(self.index_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        entry = None
+                    if entry is None:
+                        break  # torn tail from an interrupted append
+                    good_bytes += len(line)
+                    if isinstance(entry, dict):
+                        data_name = entry["data"]
+                    else:
+                        blob_hash, offset, length, codec = entry
+                        self._blobs[sys.intern(blob_hash)] = [offset, length, codec]
+            if os.path.getsize(self.index_path) > good_bytes:
+                with open(self.index_path, "r+b") as f:
+                    f.truncate(good_bytes)
+        except FileNotFoundError:
+            pass
+
+        if data_name is None:
+            data_name = os.path.basename(os.path.splitext(self.path)[0]) + ".0.dat"
+            self._write_index(data_name, {})
+        self._data = _PackedFile(os.path.join(os.path.dirname(self.path), data_name))
+        self._data._open()
+        self._index_file = open(self.index_path, "ab")
+        # Nothing is referenced until headers are retained
+        self._dead_bytes = sum(length for _, length, _ in self._blobs.values())
+        self._live_bytes = 0
+
+    def _write_index(self, data_name, blobs):
+        """Atomically replace bodies.idx (caller holds the lock)"""
+        directory = os.path.dirname(self.index_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps({"data": data_name}).encode("utf-8") + b"\n")
+            for blob_hash, (offset, length, codec) in blobs.items():
+                f.write(json.dumps([blob_hash, offset, length, codec]).encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def _put_blob(self, text):
+        """Store a body text once and return its hash, counting one more reference (caller holds the lock)"""
+        data = text.encode("utf-8")
+        blob_hash = content_hash(data)
+        blob = self._blobs.get(blob_hash)
+        if blob is None:
+            codec = self.codec
+            stored = compress(data, codec)
+            if len(stored) >= len(data):
+                codec, stored = "none", data
+            offset = self._data.append(stored)
+            blob = self._blobs[blob_hash] = [offset, len(stored), codec]
+            self._index_file.write(json.dumps([blob_hash, offset, len(stored), codec]).encode("utf-8") + b"\n")
+            self._dead_bytes += len(stored)
+        self._retain_hash(blob_hash)
+        return blob_hash
+
+    def _retain_hash(self, blob_hash):
+        blob = self._blobs.get(blob_hash)
+        if blob is None:
+            return
+        count = self._refs.get(blob_hash, 0)
+        if count == 0:
+            self._dead_bytes -= blob[1]
+            self._live_bytes += blob[1]
+        self._refs[blob_hash] = count + 1
+
+    def _get_blob(self, blob_hash):
+        offset, length, codec = self._blobs[blob_hash]
+        return decompress(self._data.read(offset, length), codec).decode("utf-8")
+
+    def release(self, header):
+        """Drop a sold artifact's references to its bodies"""
+        ref = header.get(BODY_REF)
+        if not isinstance(ref, dict):
+            return  # plain bodies are append-only
+        with self._lock:
+            self._load_index()
+            for blob_hash in ref.values():
+                count = self._refs.get(blob_hash, 0)
+                if count <= 1:
+                    self._refs.pop(blob_hash, None)
+                    if count and blob_hash in self._blobs:
+                        length = self._blobs[blob_hash][1]
+                        self._live_bytes -= length
+                        self._dead_bytes += length
+                else:
+                    self._refs[blob_hash] = count - 1
+
+    def _compact(self):
+        """Rewrite the data file with referenced bodies only (caller holds the lock)
+
+        The new data file gets a fresh name and the index is swapped in
+        atomically, so a crash leaves either the old or the new pair intact.
+        """
+        old_path = self._data.path
+        stem = os.path.basename(os.path.splitext(self.path)[0])
+        generation = int(os.path.basename(old_path).split(".")[-2]) + 1
+        data_name = f"{stem}.{generation}.dat"
+
+        new_data = _PackedFile(os.path.join(os.path.dirname(self.path), data_name))
+        blobs = {}
+        for blob_hash in self._refs:
+            offset, length, codec = self._blobs[blob_hash]
+            blobs[blob_hash] = [new_data.append(self._data.read(offset, length)), length, codec]
+        new_data.flush()
+        self._index_file.close()
+        self._write_index(data_name, blobs)
+
+        self._data.close()
+        os.remove(old_path)
+        self._data = new_data
+        self._blobs = blobs
+        self._index_file = open(self.index_path, "ab")
+        self._dead_bytes = 0
+
+    # --- shared ---
+
+    def flush(self):
+        """Make appended bodies durable before headers referring to them are saved"""
+        with self._lock:
+            self._plain.flush()
+            if self._data is not None:
+                self._data.flush()
+                self._index_file.flush()
+                os.fsync(self._index_file.fileno())
+
+    def _compaction_due(self):
+        if self._data is None:
+            return False
+        total = self._live_bytes + self._dead_bytes
+        return self._dead_bytes > 64 * 1024 and self._dead_bytes > total * self.compact_ratio
+
+    def compaction_due(self):
+        """True when unreferenced bodies make up enough of the data file to compact it"""
+        with self._lock:
+            return self._compaction_due()
+
+    def maybe_compact(self):
+        """Drop unreferenced bodies once they make up most of the data file
+
+        Call only after the collection referring to the store has been saved
+        durably, so no saved header can point at a body that is about to go.
+        """
+        with self._lock:
+            if not self._compaction_due():
+                return False
+            self._compact()
+            return True
+
+    def close(self):
+        with self._lock:
+            self._plain.close()
+            if self._data is not None:
+                self._data.close()
+                self._index_file.close()
+                self._data = None
+                self._index_file = None
+                self._blobs = None
+                self._refs = {}
+
+    # --- artifact helpers ---
+
+    def offload(self, artifact):
+        """Header copy of an artifact with its body moved into the store
+
+        Headers that are already offloaded are returned as they are, after
+        counting their references in the deduplicating store.
+        """
+        if not any(field in artifact for field in BODY_FIELDS):
+            ref = artifact.get(BODY_REF)
+            if isinstance(ref, dict):
+                with self._lock:
+                    self._load_index()
+                    for blob_hash in ref.values():
+                        self._retain_hash(blob_hash)
+            return artifact
+
+        header = {key: value for key, value in artifact.items() if key not in BODY_FIELDS}
+        if self.dedup:
+            with self._lock:
+                self._load_index()
+                header[BODY_REF] = {
+                    field: self._put_blob(artifact[field]) for field in BODY_FIELDS if artifact.get(field)
+                }
+        else:
+            header[BODY_REF] = self.append(artifact.get("ascii_art"), artifact.get("description"))
+        return header
+
+    def with_body(self, header):
+        """Full artifact for a header, reading its body from the store
+
+        A body that is no longer in the store (e.g. a save from before a crash
+        pointing at data that never reached disk) is left out, as if the
+        artifact had none.
+        """
+        ref = header.get(BODY_REF)
+        if ref is None:
+            return header
+        artifact = {key: value for key, value in header.items() if key != BODY_REF}
+        if isinstance(ref, dict):
+            with self._lock:
+                self._load_index()
+                for field, blob_hash in ref.items():
+                    if blob_hash in self._blobs:
+                        artifact[field] = self._get_blob(blob_hash)
+        else:
+            try:
+                ascii_art, description = self.read(ref)
+            except ValueError:
+                return artifact
+            if ascii_art:
+                artifact["ascii_art"] = ascii_art
+            if description:
+                artifact["description"] = description
+        return artifact
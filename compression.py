@@ -0,0 +1,56 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is used when it isn't installed
+    zstandard = None
+
+# One-byte tags for self-describing blobs (see pack/unpack)
+CODEC_TAGS = {"none": b"N", "zlib": b"Z", "zstd": b"S"}
+TAG_CODECS = {tag: codec for codec, tag in CODEC_TAGS.items()}
+
+def resolve_codec(name="auto"):
+    """Codec name to use: 'auto' picks zstd when available, else zlib"""
+    if name in (None, False, "none"):
+        return "none"
+    if name == "auto":
+        return "zstd" if zstandard else "zlib"
+    if name == "zstd" and not zstandard:
+        raise ValueError("zstd compression needs the 'zstandard' package (pip install zstandard)")
+    if name not in CODEC_TAGS:
+        raise ValueError(f"Unknown compression codec: {name}")
+    return name
+
+def compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=6).compress(data)
+    if codec == "zlib":
+        return zlib.compress(data, 6)
+    return data
+
+def decompress(data, codec):
+    """Inverse of compress(); corrupt data raises ValueError"""
+    if codec == "zstd":
+        if not zstandard:
+            raise ValueError("data is zstd-compressed but the 'zstandard' package is not installed")
+        try:
+            return zstandard.ZstdDecompressor().decompress(data)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"corrupt zstd data: {e}") from e
+    if codec == "zlib":
+        try:
+            return zlib.decompress(data)
+        except zlib.error as e:
+            raise ValueError(f"corrupt zlib data: {e}") from e
+    return data
+
+def pack(data, codec):
+    """Compress data into a blob that records its own codec"""
+    return CODEC_TAGS[codec] + compress(data, codec)
+
+def unpack(blob):
+    """Original data of a pack()ed blob"""
+    codec = TAG_CODECS.get(blob[:1])
+    if codec is None:
+        raise ValueError("not a packed blob")
+    return decompress(blob[1:], codec)
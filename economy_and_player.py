@@ -2,63 +2,218 @@ import os
 import json
 import random
 from utils import Rarity, Category, save_json, load_json, OUTPUT_DIR, SAVE_DIR
+from artifact_collection import ArtifactCollection
+from body_store import ArtifactBodyStore, BODY_REF
+from artifact import Artifact
+from market_history import MarketHistory
+
+# Market demand rules, shared with the vectorized MarketEngine
+INITIAL_DEMAND_RANGE = (0.8, 1.2)
+DEMAND_DRIFT = 0.15  # largest random change per update
+DEMAND_HIGH = 1.2  # above this demand tends to fall...
+DEMAND_LOW = 0.8  # ...and below this it tends to rise
+DEMAND_REVERSION = 0.05
+DEMAND_MIN = 0.5
+DEMAND_MAX = 1.5
+
+# Rarity lookup table for valuation, so pricing never scans the Rarity enum
+RARITY_VALUE_RANGES = {rarity.value: Rarity.get_value_range(rarity) for rarity in Rarity}
+FALLBACK_VALUE_RANGE = (5, 15)  # for rarities outside the enum
+
+def draw_base_value(rarity):
+    """Random base value from a rarity's range"""
+    min_val, max_val = RARITY_VALUE_RANGES.get(rarity, FALLBACK_VALUE_RANGE)
+    return random.randint(min_val, max_val)
 
 class ArtifactEconomy:
     """Manages market dynamics and artifact valuation"""
     
-    def __init__(self):
-        self.market_fluctuations = {}
-        self.player_reputation = 1.0
+    def __init__(self, storage=None):
+        self.storage = storage  # optional save backend (e.g. SQLiteStore); JSON files otherwise
+        # Bumped whenever demand or reputation changes, so cached pricing knows when it is stale
+        self.market_epoch = 0
+        self._market_fluctuations = {}
+        self._player_reputation = 1.0
+        self._value_factors = None
+        self._cached_values = {}
+        self._cached_values_key = None
+        self.market_history = MarketHistory()  # demand per category after every market change
         self.initialize_market()
         
+    @property
+    def market_fluctuations(self):
+        return self._market_fluctuations
+    
+    @market_fluctuations.setter
+    def market_fluctuations(self, fluctuations):
+        self._market_fluctuations = fluctuations
+        self._market_changed()
+        
+    @property
+    def player_reputation(self):
+        return self._player_reputation
+    
+    @player_reputation.setter
+    def player_reputation(self, reputation):
+        if reputation != self._player_reputation:
+            self._player_reputation = reputation
+            self._market_changed()
+            
+    def _market_changed(self):
+        """Start a new market epoch, dropping cached pricing factors and values"""
+        self.market_epoch += 1
+        self._value_factors = None
+        self._cached_values = {}
+        
+    def _factors(self):
+        """Cached (category -> demand multiplier, reputation) for the current epoch"""
+        if self._value_factors is None:
+            multipliers = dict(self._market_fluctuations)
+            # Artifact records hold categories as enum members, so key those too
+            for category in Category:
+                if category.value in multipliers:
+                    multipliers[category] = multipliers[category.value]
+            self._value_factors = (multipliers, self._player_reputation)
+        return self._value_factors
+        
     def initialize_market(self):
         """Set up initial market conditions"""
         # Initialize random market demand for each category
         for category in Category:
-            self.market_fluctuations[category.value] = random.uniform(0.8, 1.2)
+            self.market_fluctuations[category.value] = random.uniform(*INITIAL_DEMAND_RANGE)
+        self._market_changed()
+        self.market_history.record(self.market_fluctuations)
             
     def update_market(self):
         """Update market conditions - called periodically"""
         for category in self.market_fluctuations:
             # Current value affects how it changes (regression to mean)
             current = self.market_fluctuations[category]
-            change = random.uniform(-0.15, 0.15)
+            change = random.uniform(-DEMAND_DRIFT, DEMAND_DRIFT)
             
             # Higher values tend to decrease, lower values tend to increase
-            if current > 1.2:
-                change -= 0.05
-            elif current < 0.8:
-                change += 0.05
+            if current > DEMAND_HIGH:
+                change -= DEMAND_REVERSION
+            elif current < DEMAND_LOW:
+                change += DEMAND_REVERSION
                 
             # Apply change with limits
-            new_value = max(0.5, min(1.5, current + change))
+            new_value = max(DEMAND_MIN, min(DEMAND_MAX, current + change))
             self.market_fluctuations[category] = new_value
+        self._market_changed()
+        self.market_history.record(self.market_fluctuations)
+            
+    def simulate_market(self, ticks, markets=1, seed=None):
+        """Project demand forward from current conditions without changing them
+        
+        Runs the vectorized MarketEngine (needs numpy) and returns it together
+        with the demand after each tick, shaped (ticks, markets, categories).
+        """
+        from market_engine import MarketEngine
+        engine = MarketEngine.from_economy(self, markets=markets, seed=seed)
+        return engine, engine.step(ticks, history=True)
             
+    def base_value(self, artifact):
+        """An artifact's base value, or the middle of its rarity range if it has none
+        
+        Pricing never changes the artifact: permanent values are given by
+        fix_base_values() and Player.add_to_collection(), which keep the
+        collection's indexes and change tracking up to date.
+        """
+        base_value = artifact.get("value", 0)
+        if not base_value:
+            min_val, max_val = RARITY_VALUE_RANGES.get(artifact.get("rarity", "common"), FALLBACK_VALUE_RANGE)
+            base_value = (min_val + max_val) // 2
+        return base_value
+    
+    def fix_base_values(self, collection):
+        """Give every artifact in a collection without a base value a permanent one
+        
+        Returns how many were fixed. The collection is reindexed for each, which
+        also marks it changed for incremental save backends.
+        """
+        fixed = 0
+        for artifact_id, artifact in collection.items():
+            if not artifact.get("value", 0):
+                artifact["value"] = draw_base_value(artifact.get("rarity", "common"))
+                collection.reindex(artifact_id)
+                fixed += 1
+        return fixed
+    
+    def _value_cache(self):
+        """Cached values (id -> (base value, value)) for the current epoch and reputation"""
+        key = (self.market_epoch, self._player_reputation)
+        if self._cached_values_key != key:
+            self._cached_values = {}
+            self._cached_values_key = key
+        return self._cached_values
+    
     def calculate_value(self, artifact):
         """Calculate the current market value of an artifact"""
-        rarity = artifact.get("rarity", "common")
-        category = artifact.get("category", "unknown")
+        cache = self._value_cache()
+        artifact_id = artifact.get("id")
         
-        # Use base value if it's already calculated
-        base_value = artifact.get("value", 0)
+        # Use the artifact's base value, or a stand-in from its rarity if it has none
+        base_value = self.base_value(artifact)
         
-        # If no base value, calculate from rarity
-        if base_value == 0:
-            for r in Rarity:
-                if r.value == rarity:
-                    min_val, max_val = Rarity.get_value_range(r)
-                    base_value = random.randint(min_val, max_val)
-                    break
-            if base_value == 0:  # Fallback if rarity not found
-                base_value = random.randint(5, 15)
+        cached = cache.get(artifact_id)
+        if cached is not None and cached[0] == base_value:
+            return cached[1]
         
         # Apply market fluctuation
-        market_multiplier = self.market_fluctuations.get(category, 1.0)
+        multipliers, reputation = self._factors()
+        market_multiplier = multipliers.get(artifact.get("category", "unknown"), 1.0)
         
         # Calculate current market value
-        current_value = int(base_value * market_multiplier * self.player_reputation)
+        current_value = max(1, int(base_value * market_multiplier * reputation))  # Ensure minimum value of 1
         
-        return max(1, current_value)  # Ensure minimum value of 1
+        if artifact_id:
+            cache[artifact_id] = (base_value, current_value)
+        return current_value
+    
+    def calculate_values(self, artifacts):
+        """Current market values of many artifacts at once, in order
+        
+        Same pricing as calculate_value, in one pass with the rarity table and
+        the epoch's multipliers and reputation looked up once for the batch.
+        Values already priced this epoch come straight from the cache.
+        """
+        multipliers, reputation = self._factors()
+        get_multiplier = multipliers.get
+        cache = self._value_cache()
+        get_cached = cache.get
+        
+        values = []
+        append = values.append
+        for artifact in artifacts:
+            if type(artifact) is Artifact:
+                # Read the record's slots directly rather than through its dict interface
+                artifact_id = artifact.id
+                base_value = artifact.value or 0
+                category = artifact.category or "unknown"
+            else:
+                artifact_id = artifact.get("id")
+                base_value = artifact.get("value", 0)
+                category = artifact.get("category", "unknown")
+            if not base_value:
+                base_value = self.base_value(artifact)
+                
+            cached = get_cached(artifact_id)
+            if cached is not None and cached[0] == base_value:
+                append(cached[1])
+                continue
+                
+            current_value = int(base_value * get_multiplier(category, 1.0) * reputation)
+            if current_value < 1:
+                current_value = 1
+            if artifact_id:
+                cache[artifact_id] = (base_value, current_value)
+            append(current_value)
+        return values
+    
+    def calculate_collection_value(self, artifacts):
+        """Total current market value of a group of artifacts"""
+        return sum(self.calculate_values(artifacts))
     
     def get_market_report(self):
         """Generate a market report showing current trends"""
@@ -87,7 +242,11 @@ class ArtifactEconomy:
             else:
                 state = "Stable"
                 
-            report.append(f"- {category.capitalize()}: {multiplier:.2f}x ({state})")
+            line = f"- {category.capitalize()}: {multiplier:.2f}x ({state})"
+            # Recent demand, once there is more than one point to draw
+            if len(self.market_history.series(category, window=2)) > 1:
+                line = f"{line:<36} {self.market_history.sparkline(category, low=DEMAND_MIN, high=DEMAND_MAX)}"
+            report.append(line)
             
         return "\n".join(report)
     
@@ -109,9 +268,14 @@ class ArtifactEconomy:
     
     def save_market_state(self):
         """Save current market state to file"""
+        if self.storage:
+            self.storage.save_market(self)
+            return
+            
         market_state = {
             "fluctuations": self.market_fluctuations,
-            "player_reputation": self.player_reputation
+            "player_reputation": self.player_reputation,
+            "history": self.market_history.to_dict()
         }
         
         filepath = os.path.join(SAVE_DIR, "market_state.json")
@@ -119,23 +283,46 @@ class ArtifactEconomy:
         
     def load_market_state(self):
         """Load market state from file"""
+        if self.storage:
+            return self.storage.load_market(self)
+            
         filepath = os.path.join(SAVE_DIR, "market_state.json")
         market_state = load_json(filepath)
         
         if market_state:
-            self.market_fluctuations = market_state.get("fluctuations", self.market_fluctuations)
-            self.player_reputation = market_state.get("player_reputation", self.player_reputation)
+            self.restore_market(
+                market_state.get("fluctuations", self.market_fluctuations),
+                market_state.get("player_reputation", self.player_reputation),
+                market_state.get("history")
+            )
             return True
         
         return False
+        
+    def restore_market(self, fluctuations, player_reputation, history=None):
+        """Apply loaded market state; every save backend loads through here
+        
+        Saves from before market history was kept have none, so the history
+        then starts afresh from the loaded demand rather than keeping points
+        from this economy's own random start.
+        """
+        self.market_fluctuations = fluctuations
+        self.player_reputation = player_reputation
+        if history is not None:
+            self.market_history = MarketHistory.from_dict(history)
+        else:
+            self.market_history = MarketHistory()
+            self.market_history.record(fluctuations)
 
 
 class Player:
     """Manages player stats, collection, and actions"""
     
-    def __init__(self, starting_credits=50):
+    def __init__(self, starting_credits=50, storage=None, body_store=None):
+        self.storage = storage  # optional save backend (e.g. SQLiteStore); JSON files otherwise
+        self.body_store = body_store  # optional ArtifactBodyStore; the collection then holds headers only
         self.credits = starting_credits
-        self.collection = {}  # id -> artifact
+        self.collection = ArtifactCollection()  # id -> artifact, indexed by rarity, category and value
         self.discovered_categories = set()
         self.discovered_rarities = set(["common"])
         self.stats = {
@@ -170,8 +357,14 @@ class Player:
             from utils import generate_id
             artifact_id = generate_id()
             artifact["id"] = artifact_id
+        if not artifact.get("value", 0):
+            # Fixed before indexing so the value index and saved copy agree with every price
+            artifact["value"] = draw_base_value(artifact.get("rarity", "common"))
             
-        self.collection[artifact_id] = artifact
+        if self.body_store:
+            # Keep only the header resident; ASCII art and description go to the body file
+            artifact = self.body_store.offload(artifact)
+        self.collection.add(artifact_id, artifact)
         
         # Update discoveries
         self.discovered_categories.add(artifact.get("category"))
@@ -186,37 +379,76 @@ class Player:
             
     def remove_from_collection(self, artifact_id):
         """Remove an artifact from collection (for selling)"""
-        if artifact_id in self.collection:
-            artifact = self.collection.pop(artifact_id)
-            return artifact
-        return None
+        artifact = self.collection.remove(artifact_id)
+        if artifact is not None and self.body_store:
+            # Deduplicated bodies are shared, so only drop this artifact's references
+            self.body_store.release(artifact)
+        return artifact
     
     def get_artifact(self, artifact_id):
         """Get an artifact from the collection by ID"""
         return self.collection.get(artifact_id)
     
+    def get_artifact_with_body(self, artifact_id):
+        """Get an artifact with its ASCII art and description, reading them from the body store if needed"""
+        artifact = self.collection.get(artifact_id)
+        if artifact and BODY_REF in artifact:
+            if not self.body_store:
+                # The save was written with bodies offloaded, so keep using the body file
+                self.body_store = ArtifactBodyStore()
+            return self.body_store.with_body(artifact)
+        if artifact and hasattr(self.storage, "with_body"):
+            # Storage that loads headers only (SQLite) fetches the body on demand
+            return self.storage.with_body(artifact)
+        return artifact
+    
+    def offload_bodies(self):
+        """Move the bodies of loaded artifacts into the body store, keeping headers in memory"""
+        if not self.body_store:
+            return 0
+        moved = 0
+        for artifact_id, artifact in list(self.collection.items()):
+            header = self.body_store.offload(artifact)
+            if header is not artifact:
+                self.collection.add(artifact_id, header)
+                moved += 1
+        return moved
+    
     def get_collection_by_rarity(self):
         """Group collection by rarity"""
-        by_rarity = {}
-        for artifact_id, artifact in self.collection.items():
-            rarity = artifact.get("rarity", "common")
-            if rarity not in by_rarity:
-                by_rarity[rarity] = []
-            by_rarity[rarity].append(artifact_id)
-        return by_rarity
+        return self.collection.group_by_rarity()
     
     def get_collection_by_category(self):
         """Group collection by category"""
-        by_category = {}
-        for artifact_id, artifact in self.collection.items():
-            category = artifact.get("category", "unknown")
-            if category not in by_category:
-                by_category[category] = []
-            by_category[category].append(artifact_id)
-        return by_category
+        return self.collection.group_by_category()
+    
+    def find_artifacts(self, rarity=None, category=None, min_value=None, max_value=None):
+        """(id, artifact) pairs matching the given filters"""
+        return self.collection.query(rarity, category, min_value, max_value)
     
     def save_player_data(self):
         """Save player data to file"""
+        # Compaction drops bodies that only sold artifacts referred to, so the save
+        # recording those sales must be durable before it runs
+        compact = self.body_store is not None and self.body_store.compaction_due()
+        if self.body_store:
+            # Bodies must be on disk before any header that points at them
+            self.body_store.flush()
+            
+        if self.storage:
+            # Only the artifacts changed since the last save are written
+            self.storage.save_player(self)
+            if compact:
+                self.storage.sync()
+        else:
+            self._save_player_json(durable=compact)
+            
+        if compact:
+            # Safe now that no saved header refers to bodies that were sold
+            self.body_store.maybe_compact()
+            
+    def _save_player_json(self, durable=False):
+        """Write player_data.json and collection.json"""
         player_data = {
             "credits": self.credits,
             "stats": self.stats,
@@ -226,14 +458,20 @@ class Player:
         
         # Save player data
         filepath = os.path.join(SAVE_DIR, "player_data.json")
-        save_json(player_data, filepath)
+        save_json(player_data, filepath, durable)
         
         # Save collection separately (could be large)
         collection_path = os.path.join(SAVE_DIR, "collection.json")
-        save_json(self.collection, collection_path)
+        save_json(self.collection.to_dict(), collection_path, durable)
         
     def load_player_data(self):
         """Load player data from file"""
+        if self.storage:
+            loaded = self.storage.load_player(self)
+            if loaded:
+                self.offload_bodies()
+            return loaded
+            
         filepath = os.path.join(SAVE_DIR, "player_data.json")
         player_data = load_json(filepath)
         
@@ -247,7 +485,8 @@ class Player:
             collection_path = os.path.join(SAVE_DIR, "collection.json")
             collection_data = load_json(collection_path)
             if collection_data:
-                self.collection = collection_data
+                self.collection = ArtifactCollection(collection_data)
+                self.offload_bodies()
                 
             return True
         
@@ -255,7 +494,7 @@ class Player:
     
     def export_artifact(self, artifact_id):
         """Export a single artifact to a text file"""
-        artifact = self.get_artifact(artifact_id)
+        artifact = self.get_artifact_with_body(artifact_id)
         if not artifact:
             return False
             
@@ -291,8 +530,15 @@ class Player:
         if "description" in artifact:
             lines.append(artifact["description"])
         
-        # Write to file
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write("\n".join(lines))
+        # Write to file, unless an identical export is already there
+        content = "\n".join(lines)
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                unchanged = f.read() == content
+        except (OSError, ValueError):
+            unchanged = False
+        if not unchanged:
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.write(content)
             
         return filepath
\ No newline at end of file
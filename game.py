@@ -6,24 +6,66 @@ from utils import Rarity, Category, print_box, print_centered, print_artifact_pr
 from prompt_library import PromptLibrary
 from api_client import APIClient, DeepVoid
 from economy_and_player import ArtifactEconomy, Player
+from response_cache import ResponseCache
+from inventory_pool import ArtifactInventory
+from sqlite_store import SQLiteStore
+from save_journal import SaveJournal
+from body_store import ArtifactBodyStore
 
 class ArtifactTradingGame:
     """Main game class for the Void Artifact Trader"""
     
-    def __init__(self, api_key=None, provider="openai"):
-        # Initialize API client
-        self.api_client = APIClient(api_key, provider)
+    def __init__(self, api_key=None, provider="openai", cache_responses=False, use_pool=False, mock_options=None,
+                 storage="json", lazy_bodies=False, dedup=False):
+        # Initialize API client (shared so every DeepVoid reuses the same connection pool)
+        # Game prompts are sampled, so caching them means replaying earlier artifacts
+        cache = ResponseCache(codec="auto" if dedup else None, replay=True) if cache_responses else None
+        self.api_client = APIClient.shared(api_key, provider, cache=cache, mock_options=mock_options)
         
         # Initialize core systems
         self.deep_void = DeepVoid(self.api_client)
-        self.economy = ArtifactEconomy()
-        self.player = Player(starting_credits=50)
+        
+        # Optional stock of pre-generated artifacts so purchases don't wait on the API
+        self.inventory = None
+        if use_pool:
+            self.inventory = ArtifactInventory(self.deep_void)
+            self.inventory.start()
+        
+        # Saves go to JSON files by default, a SQLite database, or a write-ahead journal
+        if storage == "sqlite":
+            self.storage = SQLiteStore()
+        elif storage == "journal":
+            self.storage = SaveJournal()
+        else:
+            self.storage = None
+        # Journal saves cost only what changed, so they can happen after every action
+        self.autosave = storage == "journal"
+        # Optionally keep artifact bodies in a memory-mapped file and only headers in memory,
+        # storing each distinct body once, compressed, when deduplicating
+        if dedup:
+            self.body_store = ArtifactBodyStore(dedup=True, codec="auto")
+        elif lazy_bodies:
+            self.body_store = ArtifactBodyStore()
+        else:
+            self.body_store = None
+        self.economy = ArtifactEconomy(storage=self.storage)
+        self.player = Player(starting_credits=50, storage=self.storage, body_store=self.body_store)
         
         # Game state
         self.turn = 0
         self.market_update_frequency = 5  # turns
         self.running = True
         
+    def shutdown(self):
+        """Stop background work and release API connections"""
+        if self.inventory:
+            self.inventory.stop(timeout=1.0)
+        if self.storage:
+            self.storage.close()
+        if self.body_store:
+            self.body_store.close()
+        self.api_client.close()
+        
     def clear_screen(self):
         """Clear the console screen"""
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -37,8 +79,8 @@ class ArtifactTradingGame:
             choice = input("Would you like to continue your saved game? (y/n): ").strip().lower()
             if choice != 'y':
                 # Reset to new game
-                self.economy = ArtifactEconomy()
-                self.player = Player(starting_credits=50)
+                self.economy = ArtifactEconomy(storage=self.storage)
+                self.player = Player(starting_credits=50, storage=self.storage, body_store=self.body_store)
                 self.turn = 0
         
         # Display title screen
@@ -56,13 +98,18 @@ class ArtifactTradingGame:
         player_loaded = self.player.load_player_data()
         market_loaded = self.economy.load_market_state()
         
+        # Older saves can hold artifacts without a base value; fix one for each so prices stay stable
+        if player_loaded:
+            self.economy.fix_base_values(self.player.collection)
+        
         return player_loaded and market_loaded
         
-    def save_game(self):
+    def save_game(self, quiet=False):
         """Save the current game state"""
         self.player.save_player_data()
         self.economy.save_market_state()
-        print("\nGame saved successfully!")
+        if not quiet:
+            print("\nGame saved successfully!")
         
     def display_title_screen(self):
         """Display the game title screen"""
@@ -106,6 +153,8 @@ Will you become a master collector?
             # Increment turn if still running
             if self.running:
                 self.turn += 1
+                if self.autosave:
+                    self.save_game(quiet=True)
                 
         # End game summary
         self.display_end_game_summary()
@@ -228,12 +277,16 @@ Will you become a master collector?
         print("This may take a moment as the Void forms your artifacts...")
         
         try:
-            # Generate artifacts in batch for API efficiency
-            artifacts = self.deep_void.generate_batch(len(rarities), rarities)
+            if self.inventory:
+                # Serve from pre-generated stock, generating live only what's missing
+                result = self.inventory.fulfil(rarities)
+            else:
+                # Fan the order out across parallel requests so it takes about as long as one artifact
+                result = self.deep_void.generate_batch_result(len(rarities), rarities, concurrent=True)
             
             # Add artifacts to collection
             print("\n=== ARTIFACTS DISCOVERED ===")
-            for artifact in artifacts:
+            for artifact in result.artifacts:
                 artifact_id = self.player.add_to_collection(artifact)
                 print_artifact_preview(artifact)
                 print("")
@@ -243,6 +296,13 @@ Will you become a master collector?
                 print(f"Saved to: {filepath}")
                 print("-" * 40)
                 
+            # Only charge for what the Void actually delivered
+            failed_rarities = result.failed_rarities()
+            if failed_rarities:
+                refund = sum(Rarity.get_cost(rarity) for rarity in failed_rarities)
+                print(f"\n{len(failed_rarities)} artifact(s) could not be generated. {refund} credits have been refunded.")
+                self.player.add_credits(refund)
+                
             print(f"\nYou now have {self.player.credits} credits remaining.")
             
         except Exception as e:
@@ -287,8 +347,8 @@ Will you become a master collector?
         self.clear_screen()
         print_centered("=== COLLECTION BY RARITY ===")
         
-        # Group by rarity
-        by_rarity = self.player.get_collection_by_rarity()
+        # Artifact counts per rarity, straight from the collection's index
+        rarity_counts = self.player.collection.rarities()
         
         # Order rarities by value (highest first)
         rarity_order = [r.value for r in sorted(Rarity, key=lambda r: Rarity.get_cost(r), reverse=True)]
@@ -297,18 +357,17 @@ Will you become a master collector?
         artifact_ids = []
         
         for rarity in rarity_order:
-            if rarity in by_rarity and by_rarity[rarity]:
-                print(f"\n--- {rarity.upper()} ({len(by_rarity[rarity])}) ---")
+            if rarity_counts.get(rarity):
+                print(f"\n--- {rarity.upper()} ({rarity_counts[rarity]}) ---")
+                
+                items = self.player.collection.items_by_rarity(rarity)
+                # Price the whole group in one pass
+                values = self.economy.calculate_values([artifact for _, artifact in items])
                 
-                for artifact_id in by_rarity[rarity]:
-                    artifact = self.player.get_artifact(artifact_id)
-                    if artifact:
-                        # Update market value
-                        current_value = self.economy.calculate_value(artifact)
-                        
-                        # Display basic info
-                        print(f"{len(artifact_ids)+1}. {artifact.get('name')} (ID: {artifact_id[:4]}...) - {current_value} credits")
-                        artifact_ids.append(artifact_id)
+                for (artifact_id, artifact), current_value in zip(items, values):
+                    # Display basic info
+                    print(f"{len(artifact_ids)+1}. {artifact.get('name')} (ID: {artifact_id[:4]}...) - {current_value} credits")
+                    artifact_ids.append(artifact_id)
         
         # Offer to view specific artifact
         if artifact_ids:
@@ -325,26 +384,26 @@ Will you become a master collector?
         self.clear_screen()
         print_centered("=== COLLECTION BY CATEGORY ===")
         
-        # Group by category
-        by_category = self.player.get_collection_by_category()
+        # Artifact counts per category, straight from the collection's index
+        category_counts = self.player.collection.categories()
         
         # Display
         artifact_ids = []
         
-        for category in sorted(by_category.keys()):
-            if by_category[category]:
-                print(f"\n--- {category.upper()} ({len(by_category[category])}) ---")
+        for category in sorted(category_counts.keys()):
+            if category_counts[category]:
+                print(f"\n--- {category.upper()} ({category_counts[category]}) ---")
+                
+                items = self.player.collection.items_by_category(category)
+                # Price the whole group in one pass
+                values = self.economy.calculate_values([artifact for _, artifact in items])
                 
-                for artifact_id in by_category[category]:
-                    artifact = self.player.get_artifact(artifact_id)
-                    if artifact:
-                        # Update market value
-                        current_value = self.economy.calculate_value(artifact)
-                        rarity = artifact.get('rarity', 'common').upper()
-                        
-                        # Display basic info
-                        print(f"{len(artifact_ids)+1}. [{rarity}] {artifact.get('name')} (ID: {artifact_id[:4]}...) - {current_value} credits")
-                        artifact_ids.append(artifact_id)
+                for (artifact_id, artifact), current_value in zip(items, values):
+                    rarity = artifact.get('rarity', 'common').upper()
+                    
+                    # Display basic info
+                    print(f"{len(artifact_ids)+1}. [{rarity}] {artifact.get('name')} (ID: {artifact_id[:4]}...) - {current_value} credits")
+                    artifact_ids.append(artifact_id)
         
         # Offer to view specific artifact
         if artifact_ids:
@@ -391,7 +450,7 @@ Will you become a master collector?
     
     def display_artifact(self, artifact_id):
         """Display full details of a specific artifact"""
-        artifact = self.player.get_artifact(artifact_id)
+        artifact = self.player.get_artifact_with_body(artifact_id)
         
         if not artifact:
             print("Artifact not found.")
@@ -463,29 +522,24 @@ Will you become a master collector?
             
         print("Select artifacts to sell:\n")
         
-        # List artifacts with current market values
+        # List artifacts with current market values, priced in one pass
         artifact_ids = list(self.player.collection.keys())
-        for i, artifact_id in enumerate(artifact_ids, 1):
-            artifact = self.player.get_artifact(artifact_id)
-            
-            if artifact:
-                name = artifact.get('name', 'Unknown')
-                rarity = artifact.get('rarity', 'common').upper()
-                category = artifact.get('category', 'unknown')
+        values = dict(zip(artifact_ids, self.economy.calculate_values(self.player.collection.values())))
+        
+        # Market status per category, worked out once rather than per artifact
+        market_status = {}
+        for category, market_multiplier in self.economy.market_fluctuations.items():
+            if market_multiplier >= 1.2:
+                market_status[category] = "(HOT MARKET!)"
+            elif market_multiplier <= 0.8:
+                market_status[category] = "(Low Demand)"
                 
-                # Calculate current market value
-                current_value = self.economy.calculate_value(artifact)
-                
-                # Get market multiplier for category
-                market_multiplier = self.economy.market_fluctuations.get(category, 1.0)
-                market_status = ""
-                
-                if market_multiplier >= 1.2:
-                    market_status = "(HOT MARKET!)"
-                elif market_multiplier <= 0.8:
-                    market_status = "(Low Demand)"
-                    
-                print(f"{i}. [{rarity}] {name} - {current_value} credits {market_status}")
+        for i, (artifact_id, artifact) in enumerate(self.player.collection.items(), 1):
+            name = artifact.get('name', 'Unknown')
+            rarity = artifact.get('rarity', 'common').upper()
+            category = artifact.get('category', 'unknown')
+            
+            print(f"{i}. [{rarity}] {name} - {values[artifact_id]} credits {market_status.get(category, '')}")
                 
         print("\nEnter the numbers of artifacts to sell (comma-separated), or 'all' to sell everything:")
         sell_input = input("> ").strip().lower()
@@ -519,7 +573,8 @@ Will you become a master collector?
         for artifact_id in to_sell:
             artifact = self.player.get_artifact(artifact_id)
             if artifact:
-                current_value = self.economy.calculate_value(artifact)
+                # The price shown in the list is the price paid
+                current_value = values[artifact_id]
                 total_value += current_value
                 
                 print(f"- {artifact.get('name')} sold for {current_value} credits")
@@ -564,9 +619,7 @@ Will you become a master collector?
         print(f"- Legendary artifacts found: {self.player.stats['legendary_found']}")
         
         # Calculate collection value
-        total_collection_value = 0
-        for artifact_id, artifact in self.player.collection.items():
-            total_collection_value += self.economy.calculate_value(artifact)
+        total_collection_value = self.economy.calculate_collection_value(self.player.collection.values())
             
         print(f"\nTotal collection value: {total_collection_value} credits")
         print(f"Total wealth (credits + collection): {self.player.credits + total_collection_value} credits")
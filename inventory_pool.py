@@ -0,0 +1,198 @@
+import os
+import json
+import random
+import tempfile
+import threading
+from utils import Rarity, Category, POOL_DIR
+from api_client import BatchResult
+
+# Artifacts kept in stock for every (rarity, category) slot
+DEFAULT_TARGET_LEVELS = {
+    Rarity.COMMON: 3,
+    Rarity.UNCOMMON: 2,
+    Rarity.RARE: 1,
+    Rarity.LEGENDARY: 1
+}
+
+def _rarity_value(rarity):
+    return rarity.value if isinstance(rarity, Rarity) else str(rarity)
+
+def _category_value(category):
+    return category.value if isinstance(category, Category) else str(category)
+
+
+class ArtifactInventory:
+    """Disk-backed stock of pre-generated artifacts, refilled by background workers
+
+    Stock lives under one directory per (rarity, category) slot with one JSON
+    file per artifact. Taking an artifact claims its file with an atomic
+    rename, so several game processes can share the same pool.
+    """
+
+    def __init__(self, deep_void, directory=POOL_DIR, target_levels=None, refill_workers=2, refill_interval=5.0):
+        self.deep_void = deep_void
+        self.directory = directory
+        self.target_levels = {
+            _rarity_value(rarity): level
+            for rarity, level in (target_levels or DEFAULT_TARGET_LEVELS).items()
+        }
+        self.refill_workers = refill_workers
+        self.refill_interval = refill_interval  # seconds between checks when stock is full
+
+        self._lock = threading.Lock()
+        self._in_progress = {}  # (rarity, category) -> generations currently running
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self.refill_errors = 0
+        self.last_error = None
+
+    def _slot_dir(self, rarity, category):
+        return os.path.join(self.directory, _rarity_value(rarity), _category_value(category))
+
+    def _stock_files(self, rarity, category):
+        """Artifact files currently in a slot"""
+        try:
+            names = os.listdir(self._slot_dir(rarity, category))
+        except FileNotFoundError:
+            return []
+        return [name for name in names if name.endswith(".json")]
+
+    def stock_level(self, rarity, category):
+        """Number of artifacts in stock for a slot"""
+        return len(self._stock_files(rarity, category))
+
+    def add(self, artifact, rarity=None, category=None):
+        """Put a generated artifact into stock"""
+        rarity = _rarity_value(rarity or artifact.get("rarity", "common"))
+        category = _category_value(category or artifact.get("category", "unknown"))
+        slot_dir = self._slot_dir(rarity, category)
+        os.makedirs(slot_dir, exist_ok=True)
+
+        # Write under a temporary name so takers never see half an artifact
+        fd, tmp_path = tempfile.mkstemp(dir=slot_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(artifact, f)
+        os.replace(tmp_path, os.path.join(slot_dir, f"{artifact['id']}.json"))
+
+    def take(self, rarity, category=None):
+        """Remove and return an artifact from stock, or None if the slot is empty
+
+        Without a category, any category with stock for the rarity is used.
+        """
+        if category is not None:
+            categories = [_category_value(category)]
+        else:
+            categories = [c.value for c in Category]
+            random.shuffle(categories)
+
+        for slot_category in categories:
+            slot_dir = self._slot_dir(rarity, slot_category)
+            for name in self._stock_files(rarity, slot_category):
+                path = os.path.join(slot_dir, name)
+                claimed = f"{path}.claimed-{os.getpid()}-{threading.get_ident()}"
+                try:
+                    # Only one taker can win the rename
+                    os.rename(path, claimed)
+                except OSError:
+                    continue
+                try:
+                    with open(claimed, "r", encoding="utf-8") as f:
+                        artifact = json.load(f)
+                finally:
+                    os.remove(claimed)
+                self._wake.set()
+                return artifact
+        return None
+
+    def fulfil(self, rarities):
+        """Serve an order from stock, generating live only for the slots that are empty
+
+        Returns a BatchResult with one slot per requested rarity.
+        """
+        result = BatchResult(rarities)
+        missing = []
+        for i, rarity in enumerate(rarities):
+            artifact = self.take(rarity)
+            if artifact:
+                result.set_ok(i, artifact)
+            else:
+                missing.append(i)
+
+        if missing:
+            live = self.deep_void.generate_batch_result(
+                len(missing), [rarities[i] for i in missing], concurrent=True
+            )
+            for i, slot in zip(missing, live.slots):
+                result.slots[i] = slot
+
+        return result
+
+    def deficits(self):
+        """Slots below their target level, as (rarity, category, missing) tuples"""
+        result = []
+        for rarity, target in self.target_levels.items():
+            for category in Category:
+                with self._lock:
+                    running = self._in_progress.get((rarity, category.value), 0)
+                missing = target - self.stock_level(rarity, category) - running
+                if missing > 0:
+                    result.append((rarity, category.value, missing))
+        return result
+
+    def _claim_slot(self):
+        """Pick the emptiest slot that needs stock and mark one generation as running"""
+        deficits = self.deficits()
+        if not deficits:
+            return None
+        rarity, category, _ = max(deficits, key=lambda d: d[2])
+        with self._lock:
+            self._in_progress[(rarity, category)] = self._in_progress.get((rarity, category), 0) + 1
+        return rarity, category
+
+    def refill_once(self):
+        """Generate one artifact for the neediest slot; returns False when stock is full"""
+        slot = self._claim_slot()
+        if slot is None:
+            return False
+
+        rarity, category = slot
+        try:
+            artifact = self.deep_void.generate_single(rarity=rarity, category=category)
+            # Skip responses that failed to parse rather than stocking broken artifacts
+            if artifact.get("name") and artifact.get("ascii_art"):
+                self.add(artifact, rarity, category)
+        finally:
+            with self._lock:
+                self._in_progress[slot] -= 1
+        return True
+
+    def _refill_loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.refill_once():
+                    continue
+            except Exception as e:
+                # Background failures must not reach the game screen; back off and try later
+                self.refill_errors += 1
+                self.last_error = e
+            self._wake.wait(self.refill_interval)
+            self._wake.clear()
+
+    def start(self):
+        """Start the background refill workers"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.refill_workers):
+            thread = threading.Thread(target=self._refill_loop, name=f"inventory-refill-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        """Stop the background refill workers"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
@@ -9,7 +9,19 @@ def main():
     
     # API configuration
     parser.add_argument("--api-key", help="API key for OpenAI or Anthropic")
-    parser.add_argument("--provider", choices=["openai", "anthropic"], default="openai", help="AI provider (default: openai)")
+    parser.add_argument("--provider", choices=["openai", "anthropic", "mock"], default="openai", help="AI provider (default: openai; 'mock' runs offline)")
+    
+    parser.add_argument("--cache", action="store_true", help="Record API responses on disk and replay them for identical prompts; for reproducible runs and benchmarks, since replayed prompts repeat earlier artifacts")
+    parser.add_argument("--pool", action="store_true", help="Keep a stock of pre-generated artifacts, refilled in the background")
+    parser.add_argument("--storage", choices=["json", "sqlite", "journal"], default="json",
+                        help="Save backend (default: json; 'sqlite' and 'journal' import existing JSON saves once)")
+    parser.add_argument("--lazy-bodies", action="store_true", help="Keep artifact art and descriptions in a memory-mapped file, loaded on demand")
+    parser.add_argument("--dedup", action="store_true", help="Store each distinct artifact art/description once, compressed (implies --lazy-bodies; also compresses --cache)")
+    
+    # Mock provider options
+    parser.add_argument("--mock-latency", type=float, default=1.0, help="Mean seconds per artifact in a mock API response (default: 1.0)")
+    parser.add_argument("--mock-failure-rate", type=float, default=0.0, help="Fraction of mock API calls that fail (default: 0)")
+    parser.add_argument("--mock-seed", type=int, default=0, help="Seed for mock artifact content (default: 0)")
     
     # Other options
     parser.add_argument("--debug", action="store_true", help="Enable debug mode with extra logging")
@@ -82,8 +94,25 @@ def main():
         from game import ArtifactTradingGame
         
         # Initialize and start the game
-        game = ArtifactTradingGame(api_key=api_key, provider=args.provider)
-        game.start_game()
+        mock_options = {
+            "latency": args.mock_latency,
+            "failure_rate": args.mock_failure_rate,
+            "seed": args.mock_seed
+        }
+        game = ArtifactTradingGame(
+            api_key=api_key,
+            provider=args.provider,
+            cache_responses=args.cache,
+            use_pool=args.pool,
+            storage=args.storage,
+            lazy_bodies=args.lazy_bodies,
+            dedup=args.dedup,
+            mock_options=mock_options if args.provider == "mock" else None
+        )
+        try:
+            game.start_game()
+        finally:
+            game.shutdown()
         
     except ImportError as e:
         print(f"Error importing game components: {str(e)}")
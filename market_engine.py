@@ -0,0 +1,78 @@
+import numpy as np
+from utils import Category
+from economy_and_player import (
+    DEMAND_MIN, DEMAND_MAX, DEMAND_DRIFT, DEMAND_HIGH, DEMAND_LOW, DEMAND_REVERSION,
+    INITIAL_DEMAND_RANGE
+)
+
+NOISE_CHUNK = 256  # ticks of noise drawn per Generator call in step()
+
+
+class MarketEngine:
+    """Vectorized market simulation for balancing work
+
+    Demand multipliers for any number of independent markets are held in one
+    (markets, categories) array and advanced with the same rules as
+    ArtifactEconomy.update_market: a uniform random drift, a pull back
+    towards 1.0 outside [DEMAND_LOW, DEMAND_HIGH], and a clamp to
+    [DEMAND_MIN, DEMAND_MAX]. Noise is drawn from a seeded Generator in
+    chunks of NOISE_CHUNK ticks, so only the tick loop itself stays in
+    Python and each tick updates every market and category at once.
+    """
+
+    def __init__(self, markets=1, categories=None, seed=None, demand=None):
+        self.categories = list(categories or [category.value for category in Category])
+        self.rng = np.random.default_rng(seed)
+        if demand is None:
+            demand = self.rng.uniform(*INITIAL_DEMAND_RANGE, size=(markets, len(self.categories)))
+        self.demand = np.array(demand, dtype=np.float64).reshape(-1, len(self.categories))
+
+    @classmethod
+    def from_economy(cls, economy, markets=1, seed=None):
+        """Engine whose markets all start from an economy's current conditions"""
+        categories = list(economy.market_fluctuations)
+        start = [economy.market_fluctuations[category] for category in categories]
+        return cls(markets, categories, seed, np.tile(start, (markets, 1)))
+
+    @property
+    def markets(self):
+        return self.demand.shape[0]
+
+    def step(self, ticks=1, history=False):
+        """Advance every market by a number of ticks
+
+        Returns the demand after each tick as a (ticks, markets, categories)
+        array when history=True, else the final demand. Noise is drawn
+        NOISE_CHUNK ticks at a time, so long runs without history need memory
+        for one chunk only.
+        """
+        record = np.empty((ticks,) + self.demand.shape) if history else None
+        demand = self.demand.copy()
+        # Scratch buffers reused every tick so the loop does not allocate
+        high = np.empty(demand.shape, dtype=bool)
+        low = np.empty(demand.shape, dtype=bool)
+        pull = np.empty(demand.shape)
+        for start in range(0, ticks, NOISE_CHUNK):
+            noise = self.rng.uniform(-DEMAND_DRIFT, DEMAND_DRIFT, size=(min(NOISE_CHUNK, ticks - start),) + demand.shape)
+            for offset, tick_noise in enumerate(noise):
+                # Higher values tend to decrease, lower values tend to increase
+                np.greater(demand, DEMAND_HIGH, out=high)
+                np.less(demand, DEMAND_LOW, out=low)
+                np.subtract(low, high, out=pull, dtype=np.float64)
+                pull *= DEMAND_REVERSION
+                demand += tick_noise
+                demand += pull
+                np.minimum(demand, DEMAND_MAX, out=demand)
+                np.maximum(demand, DEMAND_MIN, out=demand)
+                if history:
+                    record[start + offset] = demand
+        self.demand = demand
+        return record if history else demand.copy()
+
+    def market(self, index=0):
+        """One market's demand as a category -> multiplier dict"""
+        return dict(zip(self.categories, self.demand[index].tolist()))
+
+    def apply_to(self, economy, index=0):
+        """Copy one market's demand into an ArtifactEconomy"""
+        economy.market_fluctuations = self.market(index)
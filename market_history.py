@@ -0,0 +1,139 @@
+import base64
+from array import array
+
+# Ticks folded into one point at each resolution of the history
+RESOLUTIONS = (1, 10, 100)
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class RingBuffer:
+    """Fixed-capacity ring of floats backed by an array, O(1) append"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._next = 0
+        self.count = 0
+
+    def append(self, value):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def last(self, n=None):
+        """The newest n values (all of them by default), oldest first; O(n)"""
+        n = self.count if n is None else min(n, self.count)
+        start = (self._next - n) % self.capacity
+        if start + n <= self.capacity:
+            return self._data[start:start + n].tolist()
+        return self._data[start:].tolist() + self._data[:self._next].tolist()
+
+    def __len__(self):
+        return self.count
+
+
+class MarketHistory:
+    """Demand history per category at several resolutions, in bounded memory
+
+    Every tick is appended to a per-category ring buffer, and running sums
+    fold each 10 and 100 ticks into one averaged point of coarser buffers.
+    Each buffer keeps the newest `capacity` points, so the history covers
+    `capacity` ticks in full detail and 100 times that at the coarsest
+    resolution. Appends are O(1) and queries are O(window).
+    """
+
+    def __init__(self, capacity=120):
+        self.capacity = capacity
+        self.ticks = 0
+        self._series = {}  # category -> {resolution: RingBuffer}
+        self._pending = {}  # category -> {resolution: [sum, count]} for the coarser resolutions
+
+    def _buffers(self, category):
+        buffers = self._series.get(category)
+        if buffers is None:
+            buffers = self._series[category] = {resolution: RingBuffer(self.capacity) for resolution in RESOLUTIONS}
+            self._pending[category] = {resolution: [0.0, 0] for resolution in RESOLUTIONS[1:]}
+        return buffers
+
+    def record(self, fluctuations):
+        """Append one tick of category -> demand multiplier"""
+        self.ticks += 1
+        for category, value in fluctuations.items():
+            buffers = self._buffers(category)
+            buffers[1].append(value)
+            for resolution, pending in self._pending[category].items():
+                pending[0] += value
+                pending[1] += 1
+                if pending[1] == resolution:
+                    buffers[resolution].append(pending[0] / resolution)
+                    pending[0] = 0.0
+                    pending[1] = 0
+
+    @property
+    def categories(self):
+        return list(self._series)
+
+    def series(self, category, resolution=1, window=None):
+        """Newest points of a category at a resolution, oldest first"""
+        buffers = self._series.get(category)
+        if buffers is None:
+            return []
+        return buffers[resolution].last(window)
+
+    def trend(self, category, window=10, resolution=1):
+        """Least-squares slope of demand per point over the newest window, or 0.0"""
+        points = self.series(category, resolution, window)
+        n = len(points)
+        if n < 2:
+            return 0.0
+        mean_x = (n - 1) / 2
+        mean_y = sum(points) / n
+        covariance = sum((x - mean_x) * (y - mean_y) for x, y in enumerate(points))
+        variance = sum((x - mean_x) ** 2 for x in range(n))
+        return covariance / variance
+
+    def sparkline(self, category, width=20, resolution=1, low=0.5, high=1.5):
+        """Block-character sparkline of the newest points on a fixed [low, high] scale"""
+        points = self.series(category, resolution, width)
+        top = len(SPARK_CHARS) - 1
+        chars = []
+        for value in points:
+            level = round((min(high, max(low, value)) - low) / (high - low) * top)
+            chars.append(SPARK_CHARS[level])
+        return "".join(chars)
+
+    # --- persistence ---
+
+    def to_dict(self):
+        """Compact, JSON-friendly form: each series as base64 float32 values, oldest first"""
+        series = {}
+        for category, buffers in self._series.items():
+            series[category] = {
+                str(resolution): base64.b64encode(array("f", buffer.last()).tobytes()).decode("ascii")
+                for resolution, buffer in buffers.items()
+            }
+        return {
+            "capacity": self.capacity,
+            "ticks": self.ticks,
+            "series": series,
+            "pending": self._pending
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        history = cls(data.get("capacity", 120))
+        history.ticks = data.get("ticks", 0)
+        for category, encoded in data.get("series", {}).items():
+            buffers = history._buffers(category)
+            for resolution, points in encoded.items():
+                values = array("f")
+                values.frombytes(base64.b64decode(points))
+                for value in values[-history.capacity:]:
+                    buffers[int(resolution)].append(value)
+        for category, pending in data.get("pending", {}).items():
+            history._buffers(category)
+            for resolution, (total, count) in pending.items():
+                history._pending[category][int(resolution)] = [total, count]
+        return history
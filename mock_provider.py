@@ -0,0 +1,172 @@
+import re
+import time
+import random
+import asyncio
+import hashlib
+import threading
+
+MOCK_MODEL = "mock-void-1"
+
+# Spec lines the prompt library writes for every artifact it asks for
+SPEC_PATTERN = re.compile(r'^CATEGORY:\s*(\w+)\s*\nRARITY:\s*(\w+)', re.MULTILINE)
+
+NAME_PREFIXES = ["The", "Lost", "Hollow", "Silent", "Fractured", "Eternal", "Inverted", "Sunken", "Whispering", "Nameless"]
+NAME_CORES = ["Codex", "Lattice", "Engine", "Reliquary", "Seed", "Orrery", "Glyph", "Vessel", "Spindle", "Lantern", "Root", "Chorus"]
+NAME_SUFFIXES = ["of Echoes", "of the Ninth Gate", "of Quiet Stars", "of Unmaking", "of the Last Archive", "of Folded Time", "of Memory", "of Ash"]
+
+FILL_GLYPHS = "╱╲╳◉✦✵∴∵⟡⌇∞ΔΣΨΩ≈≋❖★☆✧⊙◯◌⊛▲▼░▒"
+
+SENTENCES = [
+    "It was recovered from a {category} stratum that no survey has been able to locate twice.",
+    "Archivists disagree on whether it was made or merely occurred.",
+    "Its {rarity} nature shows in the way its patterns rearrange when unobserved.",
+    "Those who study it for long report a faint pressure behind the eyes.",
+    "The inner chambers appear to encode a sequence that never quite repeats.",
+    "Every catalogue entry describing it contradicts the one before.",
+    "It hums at a frequency just below hearing whenever it is moved.",
+    "Fragments of an inscription suggest it was once used to keep something out.",
+    "Its makers left no other trace beyond this single object.",
+    "Under certain light the glyphs seem to read in both directions at once.",
+]
+
+
+class MockAPIError(Exception):
+    """Simulated provider failure carrying an HTTP status code"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MockProvider:
+    """Offline provider that returns correctly formatted artifact responses
+
+    Output is seeded from the seed and the prompt, so identical prompts give
+    identical artifacts. Latency, failures and rate limiting are drawn from a
+    separate seeded stream so retries of the same prompt can still succeed.
+    """
+
+    def __init__(self, seed=0, latency=1.0, latency_jitter=0.3, latency_distribution="lognormal",
+                 failure_rate=0.0, rate_limit_rate=0.0, malformed_rate=0.0, chunk_size=40):
+        self.seed = seed
+        self.latency = latency  # mean seconds per artifact in the response, like real output-bound latency
+        self.latency_jitter = latency_jitter
+        self.latency_distribution = latency_distribution  # "fixed", "uniform", "normal" or "lognormal"
+        self.failure_rate = failure_rate  # chance of a simulated 500
+        self.rate_limit_rate = rate_limit_rate  # chance of a simulated 429
+        self.malformed_rate = malformed_rate  # chance an artifact comes back without its ASCII block
+        self.chunk_size = chunk_size  # characters per streamed chunk
+
+        self._behaviour = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _draw_latency(self, artifacts=1):
+        """Sample one call's latency from the configured distribution"""
+        with self._lock:
+            rng = self._behaviour
+            if self.latency_distribution == "fixed":
+                value = self.latency
+            elif self.latency_distribution == "uniform":
+                value = rng.uniform(self.latency - self.latency_jitter, self.latency + self.latency_jitter)
+            elif self.latency_distribution == "normal":
+                value = rng.gauss(self.latency, self.latency_jitter)
+            else:
+                # Long right tail, like real completions
+                value = self.latency * rng.lognormvariate(0, self.latency_jitter)
+        return max(0.0, value) * artifacts
+
+    def _maybe_fail(self):
+        """Raise a simulated provider error according to the configured rates"""
+        with self._lock:
+            self.calls += 1
+            roll = self._behaviour.random()
+        if roll < self.rate_limit_rate:
+            raise MockAPIError("Mock rate limit exceeded", 429)
+        if roll < self.rate_limit_rate + self.failure_rate:
+            raise MockAPIError("Mock server error", 500)
+
+    def render(self, prompt):
+        """Build the response text for a prompt without any simulated latency"""
+        return self._render(prompt)[0]
+
+    def _render(self, prompt):
+        """Response text for a prompt plus the number of artifacts in it"""
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+
+        specs = SPEC_PATTERN.findall(prompt) or [("mystical", "common")]
+        sections = [self._render_artifact(rng, category, rarity) for category, rarity in specs]
+        return "\n----------\n".join(sections), len(sections)
+
+    def _render_artifact(self, rng, category, rarity):
+        """One artifact in the NAME/CATEGORY/RARITY/ASCII_ART/DESCRIPTION format"""
+        name = f"{rng.choice(NAME_PREFIXES)} {rng.choice(NAME_CORES)} {rng.choice(NAME_SUFFIXES)}"
+
+        lines = [
+            f"NAME: {name}",
+            f"CATEGORY: {category}",
+            f"RARITY: {rarity}",
+        ]
+        if rng.random() >= self.malformed_rate:
+            lines.append("ASCII_ART:")
+            lines.append("```ascii")
+            lines.append(self._render_ascii(rng))
+            lines.append("```")
+        lines.append("DESCRIPTION:")
+        lines.append(self._render_description(rng, category, rarity))
+        return "\n".join(lines)
+
+    def _render_ascii(self, rng):
+        """A framed block of glyphs 25-40 characters wide and 12-20 lines tall"""
+        width = rng.randint(25, 40)
+        height = rng.randint(12, 20)
+        rows = ["╔" + "═" * (width - 2) + "╗"]
+        for _ in range(height - 2):
+            inner = "".join(rng.choice(FILL_GLYPHS) if rng.random() < 0.35 else " " for _ in range(width - 2))
+            rows.append("║" + inner + "║")
+        rows.append("╚" + "═" * (width - 2) + "╝")
+        return "\n".join(rows)
+
+    def _render_description(self, rng, category, rarity):
+        """Three to five short paragraphs"""
+        paragraphs = []
+        for _ in range(rng.randint(3, 5)):
+            sentences = rng.sample(SENTENCES, 3)
+            paragraphs.append(" ".join(s.format(category=category, rarity=rarity) for s in sentences))
+        return "\n\n".join(paragraphs)
+
+    def complete(self, prompt, max_tokens=2000, temperature=0.7, timeout=None):
+        """Blocking completion"""
+        text, artifacts = self._render(prompt)
+        latency = self._draw_latency(artifacts)
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Mock request timed out")
+        time.sleep(latency)
+        self._maybe_fail()
+        return text
+
+    async def acomplete(self, prompt, max_tokens=2000, temperature=0.7, timeout=None):
+        """Async completion"""
+        text, artifacts = self._render(prompt)
+        latency = self._draw_latency(artifacts)
+        if timeout is not None and latency > timeout:
+            await asyncio.sleep(timeout)
+            raise TimeoutError("Mock request timed out")
+        await asyncio.sleep(latency)
+        self._maybe_fail()
+        return text
+
+    def stream(self, prompt, max_tokens=2000, temperature=0.7):
+        """Streamed completion, spreading the latency evenly over the chunks"""
+        self._maybe_fail()
+        text, artifacts = self._render(prompt)
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or [""]
+        delay = self._draw_latency(artifacts) / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
+
+    def close(self):
+        """Nothing to release; present so APIClient can treat it like an SDK client"""
@@ -1,14 +1,90 @@
 import random
 import os
-from utils import Rarity, Category, CONFIG_DIR, load_json, save_json
+import time
+import threading
+from utils import Rarity, Category, CONFIG_DIR, load_json, save_json, estimate_tokens
+
+# Requirement blocks shared by every artifact prompt
+ASCII_REQUIREMENTS = """    * **Size:** Between 25–50 characters wide and 15–30 lines tall.
+    * **Content:** The ASCII must visually represent the artifact's structure, category, and metaphysical essence using sophisticated visual language. Emphasize visual elements like complex containment systems, interwoven structures, precise symmetry (or controlled asymmetry), energetic flow lines, fragmentation, etc., to convey meaning *through the structure itself*.
+    * **Glyphic Vocabulary:** Use a rich and creative set of characters. **Prioritize intricate line-drawing characters** (`─ │ ┌ └ ┬ ┴ ┼ ━ ┃ ╔ ╗ ╚ ╝ ═ ╬ ╭ ╮ ╰ ╯ ╱ ╲ ╳ ╴ ╶ ╸ ╺ ━ ┅ ┄ ┈ ┉ ┏ ┓ ┗ ┛ ░ ▒ ▓`) **combined with symbolic and expressive glyphs** (`⚗︎ ☍ ☼ 𓆩 ✦ ✵ ◉ ∴ ∵ ⚫ ⟡ ⌇ ¡ ¿ ‽ Ø ∞ Δ Σ Ψ Ω ζ ∇ ∫ ≈ ≋ ❖ ★ ☆ ✧ ✩ ❂ ☢ ☣ ☤ ☥ ☦ ☧ ☨ ☩ ☪ ☫ ☬ ☭ ☮ ☯ ☰ ☱ ☲ ☳ ☴ ☵ ☶ ☷ ▲ ▼ ⌘ ⊙ ◯ ◌ ⊛ ⵖ ▔ ░ ▒ ▓ etc. - feel free to list many here!`). **Avoid large, undifferentiated blocks of solid fill characters (`▒`, `▓`) unless they are part of a larger, detailed pattern or structure.** Focus on unique shapes, internal divisions, and expressive details.
+    * **Coherence:** The ASCII must have strong internal logic and design coherence. It should clearly look like a complex, designed object or structure relevant to the artifact's theme, not random characters or simple shapes.
+    * **Detail Density:** Ensure detail is distributed throughout the piece, not just isolated in one corner. Vary character types and patterns to create visual texture and convey different parts or functions."""
+
+DESCRIPTION_REQUIREMENTS = """    * Myth or history of the artifact.
+    * Its function, properties, or effects.
+    * Any paradoxes, contradictions, or strange phenomena associated with it."""
+
+RARITY_GUIDE = """    * For COMMON: Basic, foundational example.
+    * For UNCOMMON: Has some unique features or a slightly unusual property.
+    * For RARE: Distinctive, remarkable, with significant or complex properties.
+    * For LEGENDARY: Truly unique, profound, highly complex, world-altering, or reality-bending. Ensure the ASCII and description reflect this level of significance."""
+
+# Instructions identical for every request, single or batch. Prompts put this
+# first and the per-request specs after it, so providers can cache it.
+INSTRUCTION_PREFIX = f"""
+You are the ASCII core of the VOID ENGINE, generating fictional artifacts, one for each spec listed after these instructions.
+
+Follow these strict requirements for every artifact:
+
+1.  **ASCII Art (Required):** Create a highly original, *intricate*, *detailed*, and *creative* ASCII diagram that looks like a complex object or diagram.
+{ASCII_REQUIREMENTS}
+
+2.  **Description (Required):** Write a detailed description in 3-5 paragraphs *immediately following* the ASCII art block. Incorporate:
+{DESCRIPTION_REQUIREMENTS}
+    * Expand on the artifact's theme from its spec.
+
+3.  **Rarity:** Each artifact should represent the rarity given in its spec.
+{RARITY_GUIDE}
+
+4.  **Formatting:** Structure each artifact *exactly* as follows, using the specific markers, and separate artifacts with a divider line of '----------':
+
+NAME: [The artifact's name]
+CATEGORY: [The category from its spec]
+RARITY: [The rarity from its spec]
+ASCII_ART:
+```ascii
+[Your intricate ASCII art goes here, within this block]
+```
+DESCRIPTION:
+[Your 3-5 paragraph description goes here]
+
+"""
 
 class PromptLibrary:
-    def __init__(self):
-        self.libraries = self._load_prompt_libraries()
+    # Process-wide library handed out by shared()
+    _shared_library = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, check_interval=1.0):
+        self.library_path = os.path.join(CONFIG_DIR, "prompt_libraries.json")
+        self.check_interval = check_interval  # seconds between checks of the library file for changes
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        
+        # Nothing is read until the first prompt is needed
+        self._libraries = None
+        self._index_mtime = None
+        self._categories = []
+        self._index = {}
+        
+    @classmethod
+    def shared(cls):
+        """Return the process-wide library, creating it on first use"""
+        with cls._shared_lock:
+            if cls._shared_library is None:
+                cls._shared_library = cls()
+            return cls._shared_library
+        
+    @property
+    def libraries(self):
+        """Prompt templates by category, loaded on first use and reloaded when the file changes"""
+        self._refresh()
+        return self._libraries
         
     def _load_prompt_libraries(self):
         """Load prompt libraries from config files or use defaults"""
-        library_path = os.path.join(CONFIG_DIR, "prompt_libraries.json")
+        library_path = self.library_path
         
         if os.path.exists(library_path):
             return load_json(library_path)
@@ -339,74 +415,118 @@ Style: Highly specialized forms showing extreme adaptation features."""
             ]
         }
     
-    def get_prompt_for_category_and_rarity(self, category, rarity):
-        """Get a prompt template based on category and adjust for rarity, including detailed ASCII and formatting instructions."""
-        if isinstance(category, Category):
-            category = category.value
-
-        # Get templates for the category
-        templates = self.libraries.get(category, [])
+    def _library_mtime(self):
+        """Modification time of the library file, or None if it is missing"""
+        try:
+            return os.stat(self.library_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        """Read the library file and start a fresh index; categories are compiled on first use"""
+        libraries = self._load_prompt_libraries()
+        self._index_mtime = self._library_mtime()
+        self._categories = [category for category, templates in libraries.items() if templates]
+        self._index = {}
+        self._libraries = libraries
+
+    def _compile_category(self, category, rarity_str):
+        """Precompile every rarity of one category and return the entries for rarity_str
+
+        Each entry holds the finished single-artifact prompt and the compact
+        batch spec, so building a prompt is a lookup plus a cheap substitution.
+        """
+        templates = self._libraries.get(category)
         if not templates:
+            return None
+
+        with self._lock:
+            index = self._index
+            rarities = [rarity.value for rarity in Rarity]
+            if rarity_str not in rarities:
+                rarities.append(rarity_str)
+            for rarity in rarities:
+                if (category, rarity) not in index:
+                    index[(category, rarity)] = [self._compile_template(template, category, rarity) for template in templates]
+            return index[(category, rarity_str)]
+
+    def _compile_template(self, template, category, rarity_str):
+        """The prompt pieces for one template at one category and rarity"""
+        suffix = "Generate 1 artifact for this spec:\n\n" + self._format_spec(1, self._spec_body(template["prompt"], category, rarity_str))
+        return {
+            "name": template["name"],
+            "prompt": INSTRUCTION_PREFIX + suffix,
+            "suffix": suffix,
+            "spec": self._spec_body(self._theme_summary(template), category, rarity_str)
+        }
+
+    def _refresh(self):
+        """Load the libraries on first use, and reload them when the library file changes on disk
+
+        Operators can swap templates in a running process; the file is checked
+        at most once per check_interval seconds.
+        """
+        now = time.monotonic()
+        if self._libraries is not None and now < self._next_check:
+            return
+        with self._lock:
+            if self._libraries is not None and now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            if self._libraries is None or self._library_mtime() != self._index_mtime:
+                self._load()
+
+    def _compiled_templates(self, category, rarity_str):
+        """Precompiled templates for a combination, falling back to a random category if it has none"""
+        entries = self._index.get((category, rarity_str))
+        if entries is None:
+            entries = self._compile_category(category, rarity_str)
+
+        if not entries:
             # Fallback to a random category if the specified one is empty or invalid
             print(f"Warning: Category '{category}' not found or empty. Falling back to random category.")
-            category = random.choice(list(self.libraries.keys()))
-            templates = self.libraries.get(category, [])
-            if not templates: # Should not happen if default libraries are created
+            if not self._categories: # Should not happen if default libraries are created
                  raise ValueError("No prompt templates available in any category.")
+            category = random.choice(self._categories)
+            return self._compiled_templates(category, rarity_str)
 
-        # Select a random template
-        template = random.choice(templates)
-        base_prompt_instruction = template["prompt"] # This is the core theme/task instruction
-
-        # Determine rarity string
-        rarity_str = rarity.value if isinstance(rarity, Rarity) else str(rarity)
-
-        # Detailed instructions for the AI, combining general requirements with rarity
-        detailed_instructions = f"""
-You are the ASCII core of the VOID ENGINE, generating a fictional artifact.
-
-Based on the theme: "{base_prompt_instruction}"
-
-Follow these strict requirements for your output:
-
-1.  1.  **ASCII Art (Required):** Create a highly original, *intricate*, *detailed*, and *creative* ASCII diagram that looks like a complex object or diagram.
-    * **Size:** Between 25–50 characters wide and 15–30 lines tall.
-    * **Content:** The ASCII must visually represent the artifact's structure, category, and metaphysical essence using sophisticated visual language. Emphasize visual elements like complex containment systems, interwoven structures, precise symmetry (or controlled asymmetry), energetic flow lines, fragmentation, etc., to convey meaning *through the structure itself*.
-    * **Glyphic Vocabulary:** Use a rich and creative set of characters. **Prioritize intricate line-drawing characters** (`─ │ ┌ └ ┬ ┴ ┼ ━ ┃ ╔ ╗ ╚ ╝ ═ ╬ ╭ ╮ ╰ ╯ ╱ ╲ ╳ ╴ ╶ ╸ ╺ ━ ┅ ┄ ┈ ┉ ┏ ┓ ┗ ┛ ░ ▒ ▓`) **combined with symbolic and expressive glyphs** (`⚗︎ ☍ ☼ 𓆩 ✦ ✵ ◉ ∴ ∵ ⚫ ⟡ ⌇ ¡ ¿ ‽ Ø ∞ Δ Σ Ψ Ω ζ ∇ ∫ ≈ ≋ ❖ ★ ☆ ✧ ✩ ❂ ☢ ☣ ☤ ☥ ☦ ☧ ☨ ☩ ☪ ☫ ☬ ☭ ☮ ☯ ☰ ☱ ☲ ☳ ☴ ☵ ☶ ☷ ▲ ▼ ⌘ ⊙ ◯ ◌ ⊛ ⵖ ▔ ░ ▒ ▓ etc. - feel free to list many here!`). **Avoid large, undifferentiated blocks of solid fill characters (`▒`, `▓`) unless they are part of a larger, detailed pattern or structure.** Focus on unique shapes, internal divisions, and expressive details.
-    * **Coherence:** The ASCII must have strong internal logic and design coherence. It should clearly look like a complex, designed object or structure relevant to the artifact's theme, not random characters or simple shapes.
-    * **Detail Density:** Ensure detail is distributed throughout the piece, not just isolated in one corner. Vary character types and patterns to create visual texture and convey different parts or functions.
+        return category, entries
 
+    def get_prompt_for_category_and_rarity(self, category, rarity):
+        """Get a prompt template based on category and adjust for rarity, including detailed ASCII and formatting instructions.
 
-2.  **Description (Required):** Write a detailed description in 3-5 paragraphs *immediately following* the ASCII art block. Incorporate:
-    * Myth or history of the artifact.
-    * Its function, properties, or effects.
-    * Any paradoxes, contradictions, or strange phenomena associated with it.
-    * Expand on the themes from the initial prompt instruction.
+        The prompt is the shared INSTRUCTION_PREFIX followed by this artifact's
+        spec; both parts are returned separately too so callers can mark the
+        prefix as cacheable.
+        """
+        if isinstance(category, Category):
+            category = category.value
 
-3.  **Rarity:** This artifact should represent a {rarity_str} item.
-    * For COMMON: Basic, foundational example.
-    * For UNCOMMON: Has some unique features or a slightly unusual property.
-    * For RARE: Distinctive, remarkable, with significant or complex properties.
-    * For LEGENDARY: Truly unique, profound, highly complex, world-altering, or reality-bending. Ensure the ASCII and description reflect this level of significance.
+        # Determine rarity string
+        rarity_str = rarity.value if isinstance(rarity, Rarity) else str(rarity)
 
-4.  **Formatting:** Structure your entire response *exactly* as follows, using the specific markers:
+        self._refresh()
+        category, entries = self._compiled_templates(category, rarity_str)
 
-NAME: [The artifact's name]
-CATEGORY: {category}
-RARITY: {rarity_str}
-ASCII_ART:
-```ascii
-[Your intricate ASCII art goes here, within this block]
-DESCRIPTION:
-[Your 3-5 paragraph description goes here]
-"""
+        # Select a random template
+        entry = random.choice(entries)
         
         return {
-            "name": template["name"], # This is the internal name of the prompt template, not the artifact name
-            "prompt": detailed_instructions, # Use the full, detailed instructions as the actual prompt
+            "name": entry["name"], # This is the internal name of the prompt template, not the artifact name
+            "prompt": entry["prompt"], # Use the full, detailed instructions as the actual prompt
+            "prefix": INSTRUCTION_PREFIX,
+            "suffix": entry["suffix"],
             "category": category,
             "rarity": rarity_str # Store the rarity string used in the prompt
         }
+
+    def _spec_body(self, theme, category, rarity_str):
+        """The per-artifact spec lines of a prompt"""
+        return f"CATEGORY: {category}\nRARITY: {rarity_str}\nTHEME: {theme.strip()}\n"
+
+    def _format_spec(self, number, spec):
+        """A numbered spec as it appears in a prompt"""
+        return f"Artifact {number}:\n{spec}"
         
     def get_random_prompt(self, rarity=None):
         """Get a random prompt template and adjust for rarity"""
@@ -418,19 +538,30 @@ DESCRIPTION:
             rarity = rarity.value
             
         # Pick a random category
-        category = random.choice(list(self.libraries.keys()))
+        self._refresh()
+        category = random.choice(self._categories)
         
         return self.get_prompt_for_category_and_rarity(category, rarity)
         
-    def create_batch_prompt(self, num_artifacts=5, rarities=None):
-        """Create a batch prompt for multiple artifacts with detailed instructions per artifact."""
+    def create_batch_prompt(self, num_artifacts=5, rarities=None, categories=None, compact=True):
+        """Create a batch prompt for multiple artifacts.
+
+        The compact format states the shared requirements once and then lists a
+        short spec per artifact; compact=False repeats the full single-artifact
+        prompt for every artifact. Categories are picked at random unless given.
+        """
+        if compact:
+            return "".join(self.create_batch_prompt_parts(num_artifacts, rarities, categories))
+
         if rarities is None:
             rarities = [Rarity.weighted_random() for _ in range(num_artifacts)]
+        if categories is None:
+            self._refresh()
+            categories = [random.choice(self._categories) for _ in rarities]
 
         batch_prompt_parts = ["Generate multiple artifacts with the following specifications. Ensure each artifact is as unique, creative, and intricate as possible. Separate each artifact with a divider line of '----------'.\n\n"]
 
-        for i, rarity in enumerate(rarities, 1):
-            category = random.choice(list(self.libraries.keys()))
+        for i, (rarity, category) in enumerate(zip(rarities, categories), 1):
             # Get the full detailed prompt for each artifact
             artifact_prompt_data = self.get_prompt_for_category_and_rarity(category, rarity)
 
@@ -444,4 +575,38 @@ DESCRIPTION:
             batch_prompt_parts.pop()
 
 
-        return "".join(batch_prompt_parts)
\ No newline at end of file
+        return "".join(batch_prompt_parts)
+
+    def create_batch_prompt_parts(self, num_artifacts=5, rarities=None, categories=None):
+        """Compact batch prompt as (prefix, suffix): the shared INSTRUCTION_PREFIX and the list of specs"""
+        if rarities is None:
+            rarities = [Rarity.weighted_random() for _ in range(num_artifacts)]
+
+        # One freshness check per batch, then only index lookups per artifact
+        self._refresh()
+        if categories is None:
+            categories = [random.choice(self._categories) for _ in rarities]
+
+        spec_parts = [f"Generate {len(rarities)} artifacts, one for each spec below, in order:\n"]
+        for i, (rarity, category) in enumerate(zip(rarities, categories), 1):
+            if isinstance(category, Category):
+                category = category.value
+            rarity_str = rarity.value if isinstance(rarity, Rarity) else str(rarity)
+            _, entries = self._compiled_templates(category, rarity_str)
+            spec_parts.append("\n" + self._format_spec(i, random.choice(entries)["spec"]))
+
+        return INSTRUCTION_PREFIX, "".join(spec_parts)
+
+    def _theme_summary(self, template):
+        """One-line theme for a compact spec: the template name and its opening line"""
+        opening = template["prompt"].strip().split("\n", 1)[0]
+        return f"{template['name']} - {opening}"
+
+    def batch_prompt_tokens(self, rarities):
+        """Estimated prompt tokens of the full and compact batch formats for the same order"""
+        self._refresh()
+        categories = [random.choice(self._categories) for _ in rarities]
+        return {
+            "full": estimate_tokens(self.create_batch_prompt(len(rarities), rarities, categories, compact=False)),
+            "compact": estimate_tokens(self.create_batch_prompt(len(rarities), rarities, categories, compact=True))
+        }
@@ -0,0 +1,221 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+# Default client-side limits per provider; override to match your account tier
+PROVIDER_LIMITS = {
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 150000, "max_concurrency": 16},
+    "anthropic": {"requests_per_minute": 50, "tokens_per_minute": 80000, "max_concurrency": 8},
+    "mock": {"requests_per_minute": 6000, "tokens_per_minute": 10000000, "max_concurrency": 64},
+}
+
+def error_status(error):
+    """HTTP status code carried by a provider SDK exception, if any"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+def is_overload_error(error):
+    """True for errors that mean the provider wants us to slow down (429 or 5xx)"""
+    status = error_status(error)
+    return status is not None and (status == 429 or status >= 500)
+
+def retry_after_seconds(error):
+    """Seconds the provider asked us to wait via a Retry-After header, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take tokens from the bucket and return how long to wait before they are available
+
+        The bucket may go into debt, which makes later callers queue behind
+        earlier ones instead of all retrying at once.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit adjusted AIMD-style: additive increase, multiplicative decrease"""
+
+    def __init__(self, initial=4, minimum=1, maximum=16, decrease_factor=0.5):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._waiters = deque()  # (loop, future) of coroutines waiting in aacquire(), oldest first
+
+    def _has_room(self):
+        return self.in_flight < max(1, int(self.limit))
+
+    def _wake_waiters(self):
+        """Hand free slots to waiting coroutines in FIFO order; call with the lock held"""
+        while self._waiters and self._has_room():
+            loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._resolve, future)
+            except RuntimeError:  # the waiter's loop is closed
+                self.in_flight -= 1
+
+    def _resolve(self, future):
+        # Runs on the waiter's loop; a waiter cancelled in the meantime gives its slot back
+        if future.done():
+            self._give_back()
+        else:
+            future.set_result(None)
+
+    def _give_back(self):
+        """Return a slot without counting it as a finished request"""
+        with self._condition:
+            self.in_flight -= 1
+            self._wake_waiters()
+            self._condition.notify_all()
+
+    def acquire(self):
+        """Block until a request may start"""
+        with self._condition:
+            while not self._has_room():
+                self._condition.wait()
+            self.in_flight += 1
+
+    def try_acquire(self):
+        """Start a request if there is room, without blocking"""
+        with self._condition:
+            if not self._has_room():
+                return False
+            self.in_flight += 1
+            return True
+
+    async def aacquire(self):
+        """Wait without polling until a request may start; waiters are served in order"""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if not self._waiters and self._has_room():
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._condition:
+                try:
+                    self._waiters.remove((loop, future))
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            # A slot handed over before the cancellation landed must not leak
+            if handed_over and future.done() and not future.cancelled():
+                self._give_back()
+            raise
+
+    def release(self, outcome):
+        """Finish a request and adapt the limit to its outcome ("success", "backoff" or "error")"""
+        with self._condition:
+            self.in_flight -= 1
+            if outcome == "success":
+                # Roughly +1 per limit's worth of successful requests
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            elif outcome == "backoff":
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+            self._wake_waiters()
+            self._condition.notify_all()
+
+
+class RateLimiter:
+    """Client-side request/token rate limits plus an adaptive concurrency cap"""
+
+    def __init__(self, requests_per_minute=60, tokens_per_minute=40000, max_concurrency=8,
+                 initial_concurrency=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(
+            initial=initial_concurrency or max(1, max_concurrency // 2),
+            maximum=max_concurrency
+        )
+        self._paused_until = 0.0  # monotonic time before which no request may start
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_provider(cls, provider, **overrides):
+        """Limiter configured with the default limits for a provider"""
+        limits = dict(PROVIDER_LIMITS.get(provider, {}))
+        limits.update(overrides)
+        return cls(**limits)
+
+    def _start_delay(self, estimated_tokens):
+        """Reserve budget for one request and return how long it must wait"""
+        with self._lock:
+            pause = max(0.0, self._paused_until - time.monotonic())
+        return max(pause, self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+
+    def _record_error(self, error):
+        """Classify a failed request, honouring any Retry-After the provider sent"""
+        if not is_overload_error(error):
+            return "error"
+        delay = retry_after_seconds(error)
+        if delay:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return "backoff"
+
+    @contextmanager
+    def slot(self, estimated_tokens=1):
+        """Hold a rate-limited slot for the duration of one request"""
+        self.concurrency.acquire()
+        outcome = "error"
+        try:
+            delay = self._start_delay(estimated_tokens)
+            if delay > 0:
+                time.sleep(delay)
+            yield
+            outcome = "success"
+        except Exception as e:
+            outcome = self._record_error(e)
+            raise
+        finally:
+            self.concurrency.release(outcome)
+
+    @asynccontextmanager
+    async def aslot(self, estimated_tokens=1):
+        """Async version of slot() that waits without blocking the event loop"""
+        await self.concurrency.aacquire()
+        outcome = "error"
+        try:
+            delay = self._start_delay(estimated_tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield
+            outcome = "success"
+        except Exception as e:
+            outcome = self._record_error(e)
+            raise
+        finally:
+            self.concurrency.release(outcome)
@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from utils import CACHE_DIR
+from compression import resolve_codec, pack, unpack
+
+class ResponseCache:
+    """Content-addressed cache of API responses on disk, fronted by an in-memory LRU
+
+    Entries are keyed by a hash of (provider, model, prompt, temperature,
+    max_tokens). Each entry is its own file, written to a temporary name and
+    atomically renamed into place, so several processes can share a directory.
+    With a codec ('zlib', 'zstd' or 'auto') entries are written compressed;
+    plain and compressed entries can be read either way.
+
+    Only deterministic (temperature 0) requests are cached by default, since
+    replaying a sampled response hands back the same content every time.
+    replay=True caches every request, for reproducible runs and benchmarks.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_entries=5000, max_bytes=200 * 1024 * 1024,
+                 ttl=7 * 24 * 3600, memory_entries=256, evict_every=50, codec=None, replay=False):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl  # seconds; None keeps entries until size eviction
+        self.memory_entries = memory_entries
+        self.evict_every = evict_every  # puts between eviction sweeps
+        self.codec = resolve_codec(codec)
+        self.replay = replay  # also cache sampled (temperature > 0) requests
+
+        self._memory = OrderedDict()  # key -> (created, response)
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(provider, model, prompt, temperature, max_tokens):
+        """Hash the request parameters that determine a response"""
+        payload = json.dumps([provider, model, prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def caches(self, temperature):
+        """Whether requests at this temperature are cached"""
+        return self.replay or temperature == 0
+
+    def _path(self, key):
+        """Location of an entry, sharded by the first two hex digits"""
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        """Return the cached response for a key, or None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            data = json.loads(raw if raw[:1] == b"{" else unpack(raw))
+        except (OSError, ValueError):
+            # Missing, or removed/replaced by another process mid-read
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if self._expired(data.get("created", 0)):
+            self._remove(path)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        # Touch the file so disk eviction sees it as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        response = data.get("response")
+        with self._lock:
+            self._remember(key, data.get("created", time.time()), response)
+            self.hits += 1
+        return response
+
+    def put(self, key, response):
+        """Store a response under a key"""
+        created = time.time()
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temporary file and rename so readers never see a partial entry
+        payload = json.dumps({"created": created, "response": response}, ensure_ascii=False).encode("utf-8")
+        if self.codec != "none":
+            payload = pack(payload, self.codec)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._remember(key, created, response)
+            self._puts_since_evict += 1
+            sweep = self._puts_since_evict >= self.evict_every
+            if sweep:
+                self._puts_since_evict = 0
+
+        if sweep:
+            self.evict()
+
+    def _remember(self, key, created, response):
+        """Add an entry to the in-memory LRU (caller holds the lock)"""
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def evict(self):
+        """Drop expired entries, then the least recently used until within size limits"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".tmp"):
+                    # Leftover from a writer that died mid-write
+                    if time.time() - stat.st_mtime > 3600:
+                        self._remove(path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        # Oldest access first
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        count = len(entries)
+
+        for mtime, size, path in entries:
+            over_limit = count > self.max_entries or total_bytes > self.max_bytes
+            # mtime is refreshed on hits, so an untouched entry older than the TTL is expired
+            stale = self.ttl is not None and time.time() - mtime > self.ttl
+            if not over_limit and not stale:
+                continue
+            self._remove(path)
+            count -= 1
+            total_bytes -= size
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            self._memory.clear()
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                self._remove(os.path.join(root, name))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
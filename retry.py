@@ -0,0 +1,187 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from rate_limiter import error_status, is_overload_error, retry_after_seconds
+
+# Threads used to run hedged sync calls side by side
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+class RetryPolicy:
+    """Retry settings: jittered exponential backoff, a per-call deadline and optional hedging"""
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=20.0, deadline=300.0,
+                 hedge=False, hedge_quantile=0.95, hedge_min_samples=20):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline  # seconds for the whole call, retries included; None for no limit
+        self.hedge = hedge  # send a duplicate request once a call runs past its usual latency
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples  # latencies needed before hedging kicks in
+
+    def backoff_delay(self, attempt, error=None):
+        """Full-jitter exponential backoff, never shorter than a Retry-After from the provider"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to pick the hedging threshold"""
+
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def quantile(self, q, min_samples=1):
+        """Latency at quantile q, or None until enough calls have been seen"""
+        with self._lock:
+            if len(self.samples) < min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def is_retryable(error):
+    """True for transient failures worth another attempt"""
+    if isinstance(error, TimeoutError) or is_overload_error(error):
+        return True
+    if error_status(error) in (408, 409):
+        return True
+    # SDK connection and timeout errors carry no status code
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+def _remaining(deadline):
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def call_with_retries(fn, policy, latency=None):
+    """Call fn(timeout) until it succeeds, retrying transient errors with backoff
+
+    fn receives the seconds left before the deadline (or None) so it can bound
+    the underlying request.
+    """
+    deadline = time.monotonic() + policy.deadline if policy.deadline else None
+    attempt = 0
+    while True:
+        try:
+            return _call_once(fn, policy, latency, deadline)
+        except Exception as e:
+            attempt += 1
+            if attempt >= policy.max_attempts or not is_retryable(e):
+                raise
+            delay = policy.backoff_delay(attempt - 1, e)
+            remaining = _remaining(deadline)
+            if remaining is not None and delay >= remaining:
+                raise
+            print(f"Transient API error ({str(e)}), retrying in {delay:.1f}s (attempt {attempt + 1}/{policy.max_attempts})")
+            time.sleep(delay)
+
+
+def _call_once(fn, policy, latency, deadline):
+    """Run a single attempt, hedging it with a duplicate if it runs long"""
+    remaining = _remaining(deadline)
+    if remaining is not None and remaining <= 0:
+        raise TimeoutError("API call deadline exceeded")
+
+    threshold = None
+    if policy.hedge and latency is not None:
+        threshold = latency.quantile(policy.hedge_quantile, policy.hedge_min_samples)
+
+    started = time.monotonic()
+    if threshold is None:
+        result = fn(remaining)
+        if latency is not None:
+            latency.record(time.monotonic() - started)
+        return result
+
+    primary = _hedge_executor.submit(fn, remaining)
+    done, _ = wait([primary], timeout=threshold if remaining is None else min(threshold, remaining))
+    futures = [primary]
+    if not done:
+        # Past the usual latency: race a duplicate and keep whichever answers first
+        futures.append(_hedge_executor.submit(fn, _remaining(deadline)))
+
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=_remaining(deadline), return_when=FIRST_COMPLETED)
+        if not done:
+            raise TimeoutError("API call deadline exceeded")
+        for future in done:
+            if future.exception() is None:
+                if latency is not None:
+                    latency.record(time.monotonic() - started)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def acall_with_retries(fn, policy, latency=None):
+    """Async version of call_with_retries(); fn(timeout) returns a coroutine"""
+    deadline = time.monotonic() + policy.deadline if policy.deadline else None
+    attempt = 0
+    while True:
+        try:
+            return await _acall_once(fn, policy, latency, deadline)
+        except Exception as e:
+            attempt += 1
+            if attempt >= policy.max_attempts or not is_retryable(e):
+                raise
+            delay = policy.backoff_delay(attempt - 1, e)
+            remaining = _remaining(deadline)
+            if remaining is not None and delay >= remaining:
+                raise
+            print(f"Transient API error ({str(e)}), retrying in {delay:.1f}s (attempt {attempt + 1}/{policy.max_attempts})")
+            await asyncio.sleep(delay)
+
+
+async def _acall_once(fn, policy, latency, deadline):
+    """Run a single async attempt, hedging it with a duplicate if it runs long"""
+    remaining = _remaining(deadline)
+    if remaining is not None and remaining <= 0:
+        raise TimeoutError("API call deadline exceeded")
+
+    threshold = None
+    if policy.hedge and latency is not None:
+        threshold = latency.quantile(policy.hedge_quantile, policy.hedge_min_samples)
+
+    started = time.monotonic()
+    tasks = [asyncio.ensure_future(fn(remaining))]
+    try:
+        if threshold is not None:
+            done, _ = await asyncio.wait(tasks, timeout=threshold if remaining is None else min(threshold, remaining))
+            if not done:
+                tasks.append(asyncio.ensure_future(fn(_remaining(deadline))))
+
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=_remaining(deadline), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError("API call deadline exceeded")
+            for task in done:
+                if task.exception() is None:
+                    if latency is not None:
+                        latency.record(time.monotonic() - started)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # The losing request is no longer needed
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,319 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from utils import SAVE_DIR, load_json
+from artifact_collection import ArtifactCollection
+
+def _empty_state():
+    return {"seq": 0, "player": None, "collection": {}, "market": None}
+
+def apply_record(state, record):
+    """Apply one journal record to a recovered state dict"""
+    op = record.get("op")
+    if op == "put":
+        state["collection"][record["id"]] = record["artifact"]
+    elif op == "del":
+        state["collection"].pop(record["id"], None)
+    elif op == "reset":
+        state["collection"] = {}
+    elif op == "player":
+        state["player"] = {key: value for key, value in record.items() if key not in ("seq", "op")}
+    elif op == "market":
+        # Market records only carry the history when it has changed, so merge over the last one
+        market = dict(state["market"] or {})
+        market.update((key, value) for key, value in record.items() if key not in ("seq", "op"))
+        state["market"] = market
+    state["seq"] = max(state["seq"], record.get("seq", 0))
+
+
+def read_records(path, after_seq=0):
+    """Records of a journal file newer than after_seq, and the byte length of its intact prefix
+
+    A crash mid-append can leave a torn last line; everything from the first
+    unreadable line on is ignored.
+    """
+    records = []
+    good_bytes = 0
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return records, 0
+    with f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            good_bytes += len(line)
+            if record.get("seq", 0) > after_seq:
+                records.append(record)
+    return records, good_bytes
+
+
+class SaveJournal:
+    """Write-ahead journal save backend: snapshot + append-only log of changes
+
+    Every save appends small JSON records (artifact put/del, player state,
+    market state) to journal.log, so its cost follows the change rather than
+    the size of the save. Appends are fsynced in groups: once group_size
+    records are waiting, when sync_interval has passed, or on an explicit
+    sync(). When the log grows past compact_bytes it is rotated and a
+    background thread folds it into snapshot.json.
+
+    Recovery loads the snapshot and replays rotated segments and the live
+    log on top of it, skipping records the snapshot already contains.
+    """
+
+    def __init__(self, directory=SAVE_DIR, group_size=32, sync_interval=1.0, compact_bytes=1024 * 1024):
+        self.directory = directory
+        self.group_size = group_size
+        self.sync_interval = sync_interval  # seconds unsynced records may wait
+        self.compact_bytes = compact_bytes
+
+        self.snapshot_path = os.path.join(directory, "snapshot.json")
+        self.journal_path = os.path.join(directory, "journal.log")
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq = 0
+        self._pending = 0  # records written but not yet fsynced
+        self._last_sync = time.monotonic()
+        self._state = None
+        self._compactor = None
+        self._history_written = None  # (market history, tick count) last written to the journal
+        self.compactions = 0
+        self.last_error = None
+
+    # --- recovery ---
+
+    def _segments(self):
+        """Rotated journal segments waiting for compaction, oldest first"""
+        segments = []
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if len(parts) == 3 and parts[0] == "journal" and parts[1].isdigit() and parts[2] == "log":
+                segments.append((int(parts[1]), os.path.join(self.directory, name)))
+        return [path for _, path in sorted(segments)]
+
+    def _load_snapshot(self):
+        return load_json(self.snapshot_path) or _empty_state()
+
+    def _write_snapshot(self, state):
+        """Atomically replace snapshot.json with state"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def _legacy_state(self):
+        """Start from existing JSON saves the first time the journal is used"""
+        state = _empty_state()
+        player_data = load_json(os.path.join(self.directory, "player_data.json"))
+        if player_data:
+            state["player"] = player_data
+            state["collection"] = load_json(os.path.join(self.directory, "collection.json")) or {}
+        market_state = load_json(os.path.join(self.directory, "market_state.json"))
+        if market_state:
+            state["market"] = {
+                "fluctuations": market_state.get("fluctuations", {}),
+                "player_reputation": market_state.get("player_reputation", 1.0)
+            }
+            if "history" in market_state:
+                state["market"]["history"] = market_state["history"]
+        return state
+
+    def recover(self):
+        """Rebuild the saved state from snapshot plus journal replay"""
+        os.makedirs(self.directory, exist_ok=True)
+        if not os.path.exists(self.snapshot_path) and not os.path.exists(self.journal_path) and not self._segments():
+            state = self._legacy_state()
+            if state["player"] or state["market"]:
+                self._write_snapshot(state)
+            return state
+
+        state = self._load_snapshot()
+        for path in self._segments():
+            records, _ = read_records(path, state["seq"])
+            for record in records:
+                apply_record(state, record)
+        records, good_bytes = read_records(self.journal_path, state["seq"])
+        for record in records:
+            apply_record(state, record)
+
+        # Drop a torn tail so new records start on a clean line
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > good_bytes:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_bytes)
+        return state
+
+    def _ensure_open(self):
+        """Recover once and open the live journal for appending (caller holds the lock)"""
+        if self._file is None:
+            if self._state is None:
+                self._state = self.recover()
+            self._seq = self._state["seq"]
+            self._file = open(self.journal_path, "ab")
+
+    def _recovered(self, collection=False):
+        """Recovered state, re-read from disk if it is stale or its collection was handed out"""
+        with self._lock:
+            stale = self._state is None or (collection and self._state["collection"] is None)
+            if stale:
+                if self._file is not None:
+                    # Let compaction finish and flush our own appends so recovery sees everything
+                    if self._compactor:
+                        self._compactor.join()
+                    self._file.flush()
+                self._state = self.recover()
+            self._ensure_open()
+            return self._state
+
+    # --- appending ---
+
+    def _append(self, records):
+        """Write records to the journal and fsync if the group is due (caller holds the lock)"""
+        self._ensure_open()
+        lines = []
+        for record in records:
+            self._seq += 1
+            record["seq"] = self._seq
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        if not lines:
+            return
+        self._file.write(("\n".join(lines) + "\n").encode("utf-8"))
+        self._pending += len(lines)
+        self._state = None  # recovered state no longer matches what is saved
+
+        if self._pending >= self.group_size or time.monotonic() - self._last_sync >= self.sync_interval:
+            self._sync()
+        if self._file.tell() >= self.compact_bytes:
+            self._rotate()
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def sync(self):
+        """Make every appended record durable now"""
+        with self._lock:
+            if self._file is not None and self._pending:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._sync()
+                self._file.close()
+                self._file = None
+            compactor = self._compactor
+        if compactor:
+            compactor.join()
+
+    # --- compaction ---
+
+    def _rotate(self):
+        """Seal the live journal and compact it in the background (caller holds the lock)"""
+        if self._compactor and self._compactor.is_alive():
+            return  # keep appending; the next append past the limit tries again
+        self._sync()
+        self._file.close()
+        os.replace(self.journal_path, os.path.join(self.directory, f"journal.{self._seq}.log"))
+        self._file = open(self.journal_path, "ab")
+        self._compactor = threading.Thread(target=self._compact, daemon=True)
+        self._compactor.start()
+
+    def _compact(self):
+        """Fold the snapshot and sealed segments into a new snapshot"""
+        try:
+            segments = self._segments()
+            state = self._load_snapshot()
+            for path in segments:
+                records, _ = read_records(path, state["seq"])
+                for record in records:
+                    apply_record(state, record)
+
+            self._write_snapshot(state)
+
+            # The snapshot now covers these segments; replay skips their records even if removal fails
+            for path in segments:
+                os.remove(path)
+            self.compactions += 1
+        except Exception as e:
+            self.last_error = e
+
+    # --- save backend interface ---
+
+    def save_player(self, player):
+        """Append the player's state and the collection changes since the last save"""
+        changed, removed, full = player.collection.take_changes()
+        collection = player.collection
+        records = []
+        if full:
+            records.append({"op": "reset"})
+            changed = list(collection.keys())
+        else:
+            records.extend({"op": "del", "id": artifact_id} for artifact_id in removed)
+        records.extend({"op": "put", "id": artifact_id, "artifact": dict(collection[artifact_id])} for artifact_id in changed)
+        records.append({
+            "op": "player",
+            "credits": player.credits,
+            "stats": player.stats,
+            "discovered_categories": sorted(c for c in player.discovered_categories if c),
+            "discovered_rarities": sorted(r for r in player.discovered_rarities if r)
+        })
+        try:
+            with self._lock:
+                self._append(records)
+        except OSError:
+            collection.mark_synced(False)
+            raise
+
+    def load_player(self, player):
+        state = self._recovered(collection=True)
+        player_data = state["player"]
+        if not player_data:
+            return False
+        player.credits = player_data.get("credits", player.credits)
+        player.stats = player_data.get("stats", player.stats)
+        player.discovered_categories = set(player_data.get("discovered_categories", []))
+        player.discovered_rarities = set(player_data.get("discovered_rarities", []))
+        player.collection = ArtifactCollection(state["collection"])
+        player.collection.mark_synced()
+        # The collection now holds its own records; don't keep the recovered dicts alive too.
+        # A later load recovers the collection again instead of seeing it empty.
+        state["collection"] = None
+        return True
+
+    def save_market(self, economy):
+        record = {
+            "op": "market",
+            "fluctuations": economy.market_fluctuations,
+            "player_reputation": economy.player_reputation
+        }
+        history = economy.market_history
+        with self._lock:
+            if self._history_written != (history, history.ticks):
+                record["history"] = history.to_dict()
+                self._history_written = (history, history.ticks)
+            self._append([record])
+
+    def load_market(self, economy):
+        market = self._recovered()["market"]
+        if not market:
+            return False
+        economy.restore_market(
+            market.get("fluctuations", economy.market_fluctuations),
+            market.get("player_reputation", economy.player_reputation),
+            market.get("history")
+        )
+        if "history" in market:
+            self._history_written = (economy.market_history, economy.market_history.ticks)
+        return True
@@ -0,0 +1,327 @@
+import os
+import json
+import sqlite3
+import threading
+from utils import SAVE_DIR, load_json
+
+SCHEMA_VERSION = 1
+
+# Artifact fields with their own columns; anything else rides along in `extra`
+ARTIFACT_COLUMNS = ("name", "rarity", "category", "value", "ascii_art", "description")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT,
+    rarity TEXT,
+    category TEXT,
+    value INTEGER,
+    ascii_art TEXT,
+    description TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS artifacts_rarity ON artifacts (rarity, seq);
+CREATE INDEX IF NOT EXISTS artifacts_category ON artifacts (category, seq);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS market (
+    category TEXT PRIMARY KEY,
+    multiplier REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+UPSERT_ARTIFACT = """
+INSERT INTO artifacts (id, name, rarity, category, value, ascii_art, description, extra)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    name = excluded.name, rarity = excluded.rarity, category = excluded.category,
+    value = excluded.value, extra = excluded.extra,
+    -- Headers loaded without their bodies leave the stored bodies in place
+    ascii_art = COALESCE(excluded.ascii_art, artifacts.ascii_art),
+    description = COALESCE(excluded.description, artifacts.description)
+"""
+
+# Columns read for a header-only row; NULL bodies keep the row shape _row_artifact expects
+HEADER_COLUMNS = "id, name, rarity, category, value, NULL, NULL, extra"
+
+def _artifact_row(artifact_id, artifact):
+    extra = {key: value for key, value in artifact.items() if key not in ARTIFACT_COLUMNS and key != "id"}
+    return (artifact_id,) + tuple(artifact.get(column) for column in ARTIFACT_COLUMNS) + (
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+def _row_artifact(row):
+    """Rebuild an artifact dict from (id, name, rarity, category, value, ascii_art, description, extra)"""
+    artifact = {"id": row[0]}
+    for column, value in zip(ARTIFACT_COLUMNS, row[1:7]):
+        if value is not None:
+            artifact[column] = value
+    if row[7]:
+        artifact.update(json.loads(row[7]))
+    return artifact
+
+
+class SQLiteStore:
+    """SQLite save backend for the player and market
+
+    Artifacts, stats and market demand live in their own tables, so a save
+    writes only the artifacts that changed since the last one, in a single
+    transaction. load_player() reads only artifact headers (id, name,
+    rarity, category, value and extra fields), in keyset-paginated pages;
+    ASCII art and descriptions stay in the database until with_body() fetches
+    them for the one artifact being viewed or exported. With lazy=False the
+    whole rows are loaded instead. Existing JSON saves are imported once, the
+    first time the database is opened.
+    """
+
+    def __init__(self, path=None, save_dir=SAVE_DIR, page_size=500, lazy=True):
+        self.save_dir = save_dir
+        self.path = path or os.path.join(save_dir, "void.db")
+        self.page_size = page_size
+        self.lazy = lazy  # load headers only and fetch bodies on demand
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        """Connection, opened (and migrated) on first use"""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    self._conn = self._open()
+        return self._conn
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        # WAL keeps commits cheap and lets readers run while a save is in progress
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            conn.executescript(SCHEMA)
+        if self._get_meta(conn, "schema_version") is None:
+            with conn:
+                self._set_meta(conn, "schema_version", SCHEMA_VERSION)
+            self._migrate_from_json(conn)
+        return conn
+
+    def sync(self):
+        """Make every committed save durable now
+
+        With synchronous=NORMAL, WAL commits survive a crash of the process
+        but not a power loss until a checkpoint syncs them.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _get_meta(conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    @staticmethod
+    def _set_meta(conn, key, value):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value))
+        )
+
+    # --- migration ---
+
+    def _migrate_from_json(self, conn):
+        """Import player_data.json, collection.json and market_state.json, once"""
+        player_data = load_json(os.path.join(self.save_dir, "player_data.json"))
+        market_state = load_json(os.path.join(self.save_dir, "market_state.json"))
+        if not player_data and not market_state:
+            return False
+
+        with conn:
+            if player_data:
+                collection = load_json(os.path.join(self.save_dir, "collection.json")) or {}
+                self._write_player(conn, player_data)
+                conn.executemany(UPSERT_ARTIFACT, (
+                    _artifact_row(artifact_id, artifact) for artifact_id, artifact in collection.items()
+                ))
+            if market_state:
+                self._write_market(
+                    conn, market_state.get("fluctuations", {}), market_state.get("player_reputation", 1.0),
+                    market_state.get("history")
+                )
+            self._set_meta(conn, "migrated_from_json", True)
+        return True
+
+    # --- player ---
+
+    def _write_player(self, conn, player_data):
+        for key in ("credits", "discovered_categories", "discovered_rarities"):
+            if key in player_data:
+                self._set_meta(conn, key, player_data[key])
+        conn.executemany(
+            "INSERT INTO stats (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            list(player_data.get("stats", {}).items())
+        )
+
+    def save_player(self, player):
+        """Write the player's state and the collection changes since the last save, atomically"""
+        changed, removed, full = player.collection.take_changes()
+        collection = player.collection
+        conn = self.conn
+        try:
+            with self._lock, conn:
+                self._write_player(conn, {
+                    "credits": player.credits,
+                    "stats": player.stats,
+                    "discovered_categories": sorted(c for c in player.discovered_categories if c),
+                    "discovered_rarities": sorted(r for r in player.discovered_rarities if r)
+                })
+                if full:
+                    # A collection that never came from this database replaces what is stored.
+                    # Rows are kept rather than deleted, so bodies of header-only artifacts survive.
+                    stale = set(row[0] for row in conn.execute("SELECT id FROM artifacts")).difference(collection.keys())
+                    conn.executemany("DELETE FROM artifacts WHERE id = ?", [(artifact_id,) for artifact_id in stale])
+                    changed = list(collection.keys())
+                elif removed:
+                    conn.executemany("DELETE FROM artifacts WHERE id = ?", [(artifact_id,) for artifact_id in removed])
+                conn.executemany(UPSERT_ARTIFACT, (
+                    _artifact_row(artifact_id, collection[artifact_id]) for artifact_id in changed
+                ))
+        except sqlite3.Error:
+            # Nothing was written, so keep the changes for the next attempt
+            collection.mark_synced(False)
+            raise
+
+    def load_player(self, player):
+        """Load the player's state and collection headers (whole rows unless lazy); False if nothing is saved"""
+        conn = self.conn
+        credits = self._get_meta(conn, "credits")
+        if credits is None:
+            return False
+
+        player.credits = credits
+        player.stats.update(dict(conn.execute("SELECT name, value FROM stats")))
+        player.discovered_categories = set(self._get_meta(conn, "discovered_categories", []))
+        player.discovered_rarities = set(self._get_meta(conn, "discovered_rarities", []))
+
+        player.collection.clear()
+        for artifact_id, artifact in self.iter_artifacts(bodies=not self.lazy):
+            player.collection.add(artifact_id, artifact)
+        player.collection.mark_synced()
+        return True
+
+    # --- artifacts ---
+
+    def iter_artifacts(self, rarity=None, category=None, page_size=None, bodies=True):
+        """Yield (id, artifact) in collection order, fetching one page at a time"""
+        after = 0
+        while True:
+            page = self._page(after, page_size or self.page_size, rarity, category, bodies)
+            if not page:
+                return
+            for _, artifact in page:
+                yield artifact["id"], artifact
+            after = page[-1][0]
+
+    def artifact_page(self, after=0, page_size=None, rarity=None, category=None, bodies=False):
+        """One page of (id, artifact) pairs following a cursor, for paged listings
+
+        Returns (items, cursor); pass cursor back as `after` for the next
+        page. cursor is None once there are no more rows. Pages are found by
+        position (keyset), so deep pages cost the same as the first.
+        """
+        page = self._page(after, page_size or self.page_size, rarity, category, bodies)
+        if not page:
+            return [], None
+        return [(artifact["id"], artifact) for _, artifact in page], page[-1][0]
+
+    def count_artifacts(self, rarity=None, category=None):
+        where, params = self._filters(rarity, category)
+        return self.conn.execute(f"SELECT COUNT(*) FROM artifacts {where}", params).fetchone()[0]
+
+    def get_artifact(self, artifact_id):
+        row = self.conn.execute(
+            f"SELECT id, {', '.join(ARTIFACT_COLUMNS)}, extra FROM artifacts WHERE id = ?", (artifact_id,)
+        ).fetchone()
+        return _row_artifact(row) if row else None
+
+    def with_body(self, header):
+        """Full artifact for a header loaded without its ASCII art and description"""
+        if "ascii_art" in header or "description" in header:
+            return header
+        row = self.conn.execute(
+            "SELECT ascii_art, description FROM artifacts WHERE id = ?", (header.get("id"),)
+        ).fetchone()
+        if not row or row == (None, None):
+            return header
+        artifact = dict(header)
+        for column, value in zip(("ascii_art", "description"), row):
+            if value is not None:
+                artifact[column] = value
+        return artifact
+
+    @staticmethod
+    def _filters(rarity, category, clauses=None, params=None):
+        clauses = clauses or []
+        params = params or []
+        if rarity is not None:
+            clauses.append("rarity = ?")
+            params.append(rarity)
+        if category is not None:
+            clauses.append("category = ?")
+            params.append(category)
+        return ("WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def _page(self, after, limit, rarity, category, bodies=True):
+        """Rows after a seq position, as (seq, artifact) pairs; headers only unless bodies"""
+        where, params = self._filters(rarity, category, ["seq > ?"], [after])
+        columns = f"id, {', '.join(ARTIFACT_COLUMNS)}, extra" if bodies else HEADER_COLUMNS
+        rows = self.conn.execute(
+            f"SELECT seq, {columns} FROM artifacts {where} ORDER BY seq LIMIT ?",
+            params + [limit]
+        ).fetchall()
+        return [(row[0], _row_artifact(row[1:])) for row in rows]
+
+    # --- market ---
+
+    def _write_market(self, conn, fluctuations, player_reputation, history=None):
+        conn.executemany(
+            "INSERT INTO market (category, multiplier) VALUES (?, ?) "
+            "ON CONFLICT(category) DO UPDATE SET multiplier = excluded.multiplier",
+            list(fluctuations.items())
+        )
+        self._set_meta(conn, "player_reputation", player_reputation)
+        if history is not None:
+            self._set_meta(conn, "market_history", history)
+
+    def save_market(self, economy):
+        conn = self.conn
+        with self._lock, conn:
+            self._write_market(
+                conn, economy.market_fluctuations, economy.player_reputation, economy.market_history.to_dict()
+            )
+
+    def load_market(self, economy):
+        """Load market state; False if nothing is saved"""
+        conn = self.conn
+        fluctuations = dict(conn.execute("SELECT category, multiplier FROM market"))
+        if not fluctuations:
+            return False
+        economy.restore_market(
+            fluctuations,
+            self._get_meta(conn, "player_reputation", economy.player_reputation),
+            self._get_meta(conn, "market_history")
+        )
+        return True
@@ -9,6 +9,8 @@ from enum import Enum
 CONFIG_DIR = "config"
 OUTPUT_DIR = "artifacts"
 SAVE_DIR = "saves"
+CACHE_DIR = "cache"  # Created on demand by ResponseCache
+POOL_DIR = "pool"  # Created on demand by ArtifactInventory
 
 # Ensure directories exist
 for directory in [CONFIG_DIR, OUTPUT_DIR, SAVE_DIR]:
@@ -83,10 +85,24 @@ def generate_id():
     """Generate a unique ID for an artifact"""
     return str(uuid.uuid4())[:8]
 
-def save_json(data, filepath):
-    """Save data to JSON file"""
-    with open(filepath, 'w', encoding='utf-8') as f:
+def estimate_tokens(text):
+    """Rough token count for a piece of text (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+def save_json(data, filepath, durable=False):
+    """Save data to JSON file
+    
+    The file is written under a temporary name and renamed into place, so a
+    crash leaves either the old or the new file. With durable=True it is also
+    fsynced before the rename, so the new file survives a power loss.
+    """
+    tmp_path = f"{filepath}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, filepath)
 
 def load_json(filepath):
     """Load data from JSON file"""